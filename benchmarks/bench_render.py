@@ -0,0 +1,235 @@
+# Times each stage of the script.py render pipeline for every mode at common
+# screen sizes and writes the results as JSON, so two commits can be compared:
+#
+#   python benchmarks/bench_render.py --out before.json
+#   python benchmarks/bench_render.py --out after.json --compare before.json
+#
+# Every (mode, size) case runs in a fresh child process so its peak RSS is its
+# own and sprite caches start cold, as they do for a cron run.
+from __future__ import annotations
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SIZES = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+    "5k": (5120, 2880),
+}
+# Views are evaluated at a fixed moment so every run draws the same picture.
+BENCH_NOW = datetime(2025, 6, 15, 13, 37)
+STRAY_FILES = 50
+# Encoder variants timed on the finished image; "png" is the default path.
+ENCODERS = {
+    "png": ("png", {}),
+    "png-level1": ("png", {"compress_level": 1}),
+    "png-optimize": ("png", {"optimize": True}),
+    "png-palette": ("png", {"palette": True}),
+    "png-palette-level1": ("png", {"palette": True, "compress_level": 1}),
+    "webp-lossless": ("webp", {}),
+    "bmp": ("bmp", {}),
+    "bmp-palette": ("bmp", {"palette": True}),
+}
+REGRESSION_THRESHOLD = 1.10
+
+
+def _peak_rss_kb() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _timed(stages: dict, name: str, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+    return result
+
+
+def _rasterize_sprites(script, count: int, filled: int, size: Tuple[int, int], config) -> None:
+    scale = script.SUPERSAMPLE
+    for i, (x1, y1, x2, y2) in enumerate(script._circle_boxes(count, size[0] * scale, size[1] * scale)):
+        script._circle_sprite((x2 - x1) // 2, x1 % scale, y1 % scale, i < filled, config.hollow_width, scale,
+                              config.memory_mb)
+
+
+def run_case(mode: str, size: Tuple[int, int], backend: str, show_percentage: bool) -> dict:
+    import script
+    from PIL import Image
+
+    config = script.RenderConfig(backend=backend, show_percentage=show_percentage)
+    count, filled = script.evaluate_view(mode, config, BENCH_NOW)
+    w, h = size
+    stages: dict = {}
+
+    # The layout the renderer uses: the grid fitted to the margin-inset
+    # canvas at its real aspect ratio.
+    _timed(stages, "auto_grid", script._grid_geometry, count, w * script.SUPERSAMPLE, h * script.SUPERSAMPLE)
+
+    # "rasterize" draws each distinct circle sprite at 16x and downsamples it
+    # with LANCZOS (the old full-canvas resize); "composite" pastes them.
+    if backend == "pillow":
+        _timed(stages, "rasterize", _rasterize_sprites, script, count, filled, size, config)
+    img = Image.new("RGB", size, config.background)
+    _timed(stages, "composite", script._paint_region, img, (0, 0, w, h), count, filled, config)
+    if show_percentage:
+        _timed(stages, "percentage", script._paint_badge, img, count, filled, config)
+
+    _timed(stages, "encode", img.save, io.BytesIO(), format="PNG")
+
+    encoders = {}
+    for name, (fmt, options) in ENCODERS.items():
+        buf = io.BytesIO()
+        start = time.perf_counter()
+        script.encode_image(img, buf, fmt, options, config)
+        encoders[name] = {"seconds": round(time.perf_counter() - start, 6), "bytes": buf.tell()}
+
+    # Cleanup removes the output slots left in other formats; stray files
+    # next to them must not slow it down.
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        for fmt in script.FORMATS:
+            for path in script.slot_paths(fmt):
+                open(path, "wb").close()
+        for n in range(STRAY_FILES):
+            open(os.path.join(home, f"count_{1000 + n}.png"), "wb").close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            _timed(stages, "cleanup", script.cleanup_old_wallpapers)
+
+    return {
+        "mode": mode,
+        "size": f"{w}x{h}",
+        "count": count,
+        "filled": filled,
+        "stages": {name: round(seconds, 6) for name, seconds in stages.items()},
+        "total": round(sum(stages.values()), 6),
+        "encoders": encoders,
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+
+
+def _spawn_case(mode: str, size: Tuple[int, int], args: argparse.Namespace) -> dict:
+    cmd = [sys.executable, os.path.abspath(__file__), "--case", mode, f"{size[0]}x{size[1]}",
+           "--backend", args.backend]
+    if args.no_percentage:
+        cmd.append("--no-percentage")
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def _best_of(runs: list[dict]) -> dict:
+    # Keep the fastest run per stage; peak RSS is reported as the worst seen.
+    best = dict(runs[0])
+    best["stages"] = {name: min(r["stages"][name] for r in runs) for name in runs[0]["stages"]}
+    best["total"] = min(r["total"] for r in runs)
+    best["encoders"] = {name: {"seconds": min(r["encoders"][name]["seconds"] for r in runs),
+                               "bytes": runs[0]["encoders"][name]["bytes"]} for name in runs[0]["encoders"]}
+    rss = [r["peak_rss_kb"] for r in runs if r["peak_rss_kb"] is not None]
+    best["peak_rss_kb"] = max(rss) if rss else None
+    return best
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict], baseline_path: str) -> int:
+    with open(baseline_path) as f:
+        baseline = {(r["mode"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n{'case':32} {'before':>9} {'after':>9} {'ratio':>7}  rss before/after (MB)")
+    for r in results:
+        old = baseline.get((r["mode"], r["size"]))
+        if old is None:
+            continue
+        ratio = r["total"] / old["total"] if old["total"] else float("inf")
+        flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        regressions += bool(flag)
+        rss = "/".join(f"{v / 1024:.0f}" if v else "?" for v in (old["peak_rss_kb"], r["peak_rss_kb"]))
+        print(f"{r['mode'] + ' @ ' + r['size']:32} {old['total']:9.3f} {r['total']:9.3f} {ratio:7.2f}  {rss}{flag}")
+    return regressions
+
+
+def main() -> None:
+    import script
+
+    parser = argparse.ArgumentParser(description="Benchmark the script.py render pipeline")
+    parser.add_argument("--modes", nargs="+", choices=list(script.VIEW_MAP), default=list(script.VIEW_MAP),
+                        help="Modes to benchmark (default: all)")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=list(SIZES),
+                        help="Screen sizes to benchmark (default: all)")
+    parser.add_argument("--backend", choices=script.BACKENDS, default="pillow",
+                        help="Rendering backend (default: pillow)")
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="Runs per case; the fastest is kept (default: 1)")
+    parser.add_argument("--no-percentage", action="store_true",
+                        help="Skip the percentage badge stage")
+    parser.add_argument("--out", type=str,
+                        help="Write results as JSON to this file")
+    parser.add_argument("--compare", type=str,
+                        help="Compare against a previous JSON result and exit 1 on regressions")
+    parser.add_argument("--case", nargs=2, metavar=("MODE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        w, h = map(int, args.case[1].split("x"))
+        print(json.dumps(run_case(args.case[0], (w, h), args.backend, not args.no_percentage)))
+        return
+
+    results = []
+    print(f"{'case':32} {'total':>8} {'raster':>8} {'paste':>8} {'pct':>8} {'encode':>8} {'rss MB':>8}")
+    for size_name in args.sizes:
+        for mode in args.modes:
+            r = _best_of([_spawn_case(mode, SIZES[size_name], args) for _ in range(max(1, args.repeat))])
+            results.append(r)
+            st = r["stages"]
+            rss = f"{r['peak_rss_kb'] / 1024:.0f}" if r["peak_rss_kb"] else "?"
+            print(f"{mode + ' @ ' + r['size']:32} {r['total']:8.3f} {st.get('rasterize', 0):8.3f} {st['composite']:8.3f} "
+                  f"{st.get('percentage', 0):8.3f} {st['encode']:8.3f} {rss:>8}", flush=True)
+
+    print(f"\n{'case':32} {'encoder':20} {'seconds':>8} {'KB':>8}")
+    for r in results:
+        for name, enc in r["encoders"].items():
+            print(f"{r['mode'] + ' @ ' + r['size']:32} {name:20} {enc['seconds']:8.3f} {enc['bytes'] / 1024:8.0f}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+    if args.compare and compare(results, args.compare):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
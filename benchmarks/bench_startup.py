@@ -0,0 +1,142 @@
+# Measures how long script.py takes to start, which is most of the cost of a
+# cron tick that finds its image already up to date:
+#
+#   python benchmarks/bench_startup.py --out before.json
+#   python benchmarks/bench_startup.py --out after.json --compare before.json
+#
+# Each case is a fresh interpreter. The no-op runs share one cache directory
+# that is warmed first, so they stop at the output cache as a cron tick would.
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "script.py")
+RUN_ARGS = ["--mode", "day", "--size", "1920x1080", "--preview", "--show-percentage"]
+# Modules that only a render needs; a no-op run should not load them.
+HEAVY_MODULES = ("PIL.Image", "PIL.ImageDraw", "PIL.ImageFont", "numpy")
+REGRESSION_THRESHOLD = 1.10
+
+
+def _env(home: str) -> dict:
+    env = dict(os.environ, HOME=home, TIME_VIS_CACHE_DIR=os.path.join(home, "cache"))
+    # Cron hosts cache bytecode; without it every import is compiled again.
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env.pop("TIME_VIS_OUT", None)
+    return env
+
+
+def _time_runs(cmd: list[str], env: dict, runs: int) -> dict:
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+        seconds.append(time.perf_counter() - start)
+    return {"min": round(min(seconds), 6), "median": round(statistics.median(seconds), 6)}
+
+
+def _import_times(cmd: list[str], env: dict) -> dict:
+    # -X importtime reports "self | cumulative | name" in microseconds.
+    err = subprocess.run([sys.executable, "-X", "importtime", *cmd], cwd=ROOT, env=env,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True).stderr
+    modules = {}
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def run(runs: int) -> dict:
+    with tempfile.TemporaryDirectory() as home:
+        env = _env(home)
+        # Warm the bytecode, geometry, font and output caches.
+        subprocess.run([sys.executable, SCRIPT, *RUN_ARGS], cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+        subprocess.run([sys.executable, "-c", "import script"], cwd=ROOT, env=env, check=True)
+
+        imports = _import_times(["-c", "import script"], env)
+        noop_imports = _import_times([SCRIPT, *RUN_ARGS], env)
+        slowest = sorted(imports.items(), key=lambda item: item[1][0], reverse=True)[:10]
+        return {
+            "interpreter": _time_runs([sys.executable, "-c", "pass"], env, runs),
+            "import": _time_runs([sys.executable, "-c", "import script"], env, runs),
+            "noop_file": _time_runs([sys.executable, SCRIPT, *RUN_ARGS], env, runs),
+            "noop_module": _time_runs([sys.executable, "-m", "script", *RUN_ARGS], env, runs),
+            "import_us": imports.get("script", (0, 0))[1],
+            "slowest_imports": {name: self_us for name, (self_us, _) in slowest},
+            "noop_loads": [name for name in HEAVY_MODULES if name in noop_imports],
+        }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: dict, baseline_path: str) -> int:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["result"]
+    regressions = 0
+    print(f"\n{'case':16} {'before':>9} {'after':>9} {'ratio':>7}")
+    for case in ("interpreter", "import", "noop_file", "noop_module"):
+        if case not in baseline:
+            continue
+        old, new = baseline[case]["median"], result[case]["median"]
+        ratio = new / old if old else float("inf")
+        flag = "  REGRESSION" if ratio > REGRESSION_THRESHOLD else ""
+        regressions += bool(flag)
+        print(f"{case:16} {old * 1000:8.1f}ms {new * 1000:8.1f}ms {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark script.py startup and no-op runs")
+    parser.add_argument("--runs", type=int, default=20,
+                        help="Interpreter launches per case; min and median are kept (default: 20)")
+    parser.add_argument("--out", type=str,
+                        help="Write results as JSON to this file")
+    parser.add_argument("--compare", type=str,
+                        help="Compare against a previous JSON result and exit 1 on regressions")
+    args = parser.parse_args()
+
+    result = run(max(1, args.runs))
+    print(f"{'case':16} {'min':>9} {'median':>9}")
+    for case in ("interpreter", "import", "noop_file", "noop_module"):
+        print(f"{case:16} {result[case]['min'] * 1000:8.1f}ms {result[case]['median'] * 1000:8.1f}ms")
+    print(f"\nimport script: {result['import_us'] / 1000:.1f}ms (-X importtime)")
+    for name, self_us in result["slowest_imports"].items():
+        print(f"  {name:32} {self_us / 1000:6.1f}ms")
+    print(f"no-op run loads: {', '.join(result['noop_loads']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        "result": result,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.out}")
+    if args.compare and compare(result, args.compare):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
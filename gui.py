@@ -1,5 +1,5 @@
 import sys
-import subprocess
+import shlex
 from datetime import date
 from pathlib import Path
 
@@ -7,10 +7,12 @@ from PyQt6.QtWidgets import ( # type: ignore
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
     QGridLayout, QScrollArea, QGroupBox, QRadioButton, QPushButton,
     QLabel, QLineEdit, QSpinBox, QCheckBox, QTextEdit, QColorDialog,
-    QMessageBox, QButtonGroup, QTabWidget, QComboBox
+    QMessageBox, QButtonGroup, QTabWidget, QComboBox, QProgressBar
 )
-from PyQt6.QtCore import Qt, pyqtSignal # type: ignore
-from PyQt6.QtGui import QFont, QColor # type: ignore 
+from PyQt6.QtCore import Qt, pyqtSignal, QProcess, QProcessEnvironment, QThread, QTimer # type: ignore
+from PyQt6.QtGui import QFont, QColor, QTextCursor, QImage, QPixmap # type: ignore 
+
+import script
 
 class ColorButton(QPushButton):
     colorChanged = pyqtSignal(str)
@@ -46,6 +48,31 @@ class ColorButton(QPushButton):
         self.update_color()
 
 
+class RenderWorker(QThread):
+    # Renders through script.render() off the GUI thread; the image never
+    # touches the disk. QImage (unlike QPixmap) is safe to build here.
+    rendered = pyqtSignal(QImage)
+    failed = pyqtSignal(str)
+
+    def __init__(self, mode, size, config, version=0, parent=None):
+        super().__init__(parent)
+        self.mode = mode
+        self.size = size
+        self.config = config
+        self.version = version
+
+    def run(self):
+        try:
+            img = script.render(self.mode, self.size, self.config, cancelled=self.isInterruptionRequested)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if img is None:
+            return
+        data = img.tobytes("raw", "RGB")
+        self.rendered.emit(QImage(data, img.width, img.height, 3 * img.width, QImage.Format.Format_RGB888).copy())
+
+
 class TimeVisualizerGUI(QMainWindow):
     def __init__(self): 
         super().__init__()
@@ -77,6 +104,15 @@ class TimeVisualizerGUI(QMainWindow):
         self.cron_hour = 8
         self.cron_day = 1
         self.cron_weekday = 1
+
+        self.run_kind = None
+        self.pending_run = None
+        self.cancelled = False
+        self.run_generation = 0
+
+        self.render_worker = None
+        self.pending_render = False
+        self.preview_version = 0
     
     def init_ui(self):
         central_widget = QWidget()
@@ -89,6 +125,9 @@ class TimeVisualizerGUI(QMainWindow):
         self.create_main_tab()
 
         self.create_cron_tab()
+
+        central_widget_layout.addWidget(self.create_output_group())
+        self.setup_process()
     
     def create_main_tab(self):
         main_tab = QWidget()
@@ -113,6 +152,7 @@ class TimeVisualizerGUI(QMainWindow):
         layout.addWidget(self.create_options_group())
         layout.addWidget(self.create_command_group())
         layout.addWidget(self.create_buttons())
+        layout.addWidget(self.create_preview_group())
         layout.addStretch()
     
     def create_cron_tab(self):
@@ -293,6 +333,11 @@ class TimeVisualizerGUI(QMainWindow):
             ("lifetime-years", "Lifetime (years)"),
             ("lifetime-months", "Lifetime (months)")
         ]
+        if script.DEFAULT_VIEWS_PATH:
+            try:
+                modes += [(name, f"{name} (custom)") for name in script.load_views(script.DEFAULT_VIEWS_PATH)]
+            except (OSError, ValueError) as e:
+                print(f"Ignoring custom views: {e}")
         
         for i, (mode_key, mode_desc) in enumerate(modes):
             radio = QRadioButton(mode_desc)
@@ -390,6 +435,69 @@ class TimeVisualizerGUI(QMainWindow):
         
         return group
     
+    def create_output_group(self):
+        group = QGroupBox("Output")
+        layout = QVBoxLayout(group)
+
+        self.output_text = QTextEdit()
+        self.output_text.setMaximumHeight(120)
+        self.output_text.setReadOnly(True)
+        self.output_text.setFont(QFont("Courier", 9))
+        layout.addWidget(self.output_text)
+
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel("Idle")
+        status_layout.addWidget(self.status_label)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setMaximumHeight(14)
+        self.progress_bar.hide()
+        status_layout.addWidget(self.progress_bar)
+
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #ffffff;
+                color: black;
+                border: none;
+                padding: 4px 8px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #106ebe;
+                color: white;
+            }
+        """)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_run)
+        status_layout.addWidget(self.cancel_btn)
+        layout.addLayout(status_layout)
+
+        return group
+
+    def create_preview_group(self):
+        group = QGroupBox("Preview")
+        layout = QVBoxLayout(group)
+
+        self.preview_label = QLabel("Render a preview to see the wallpaper here")
+        self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.preview_label.setMinimumHeight(180)
+        layout.addWidget(self.preview_label)
+
+        self.preview_status = QLabel("")
+        layout.addWidget(self.preview_status)
+
+        # Settings often change several times a second (typing a color,
+        # spinning the life expectancy), so the thumbnail waits for a pause.
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(150)
+        self.preview_timer.timeout.connect(self.update_thumbnail)
+
+        return group
+
     def create_buttons(self):
         widget = QWidget()
         layout = QHBoxLayout(widget)
@@ -411,6 +519,24 @@ class TimeVisualizerGUI(QMainWindow):
         """)
         run_btn.clicked.connect(self.run_script)
         layout.addWidget(run_btn) 
+
+        preview_btn = QPushButton("Render Full Size")
+        preview_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #ffffff;
+                color: black;
+                border: none;
+                padding: 4px 8px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #106ebe;
+                color: white;
+            }
+        """)
+        preview_btn.clicked.connect(self.render_preview)
+        layout.addWidget(preview_btn)
         
         copy_btn = QPushButton("Copy Command")
         copy_btn.setStyleSheet("""
@@ -545,30 +671,29 @@ class TimeVisualizerGUI(QMainWindow):
         self.cron_weekday_label.setEnabled(weekday_enabled)
         self.cron_weekday_combo.setEnabled(weekday_enabled)
     
-    def build_command(self):
-        if not self.script_path.exists():
-            return f"# Error: script.py not found at {self.script_path}"
-        
+    def build_command_args(self, preview=None):
         cmd_parts = [sys.executable, str(self.script_path)]
         
         cmd_parts.extend(["--mode", self.mode])
+        if self.mode not in script.BUILTIN_VIEWS:
+            cmd_parts.extend(["--views", script.DEFAULT_VIEWS_PATH])
         
         if self.bg_color != "#000000":
-            cmd_parts.extend(["--bg-color", '"'+self.bg_color+'"'])
+            cmd_parts.extend(["--bg-color", self.bg_color])
 
         if self.filled_color != "#ffffff":
-            cmd_parts.extend(["--filled-color", '"'+self.filled_color+'"']) 
+            cmd_parts.extend(["--filled-color", self.filled_color]) 
 
         if self.hollow_color != "#ffffff":
-            cmd_parts.extend(["--hollow-color", '"'+self.hollow_color+'"'])
+            cmd_parts.extend(["--hollow-color", self.hollow_color])
 
         if self.percentage_color != "#ffffff":
-            cmd_parts.extend(["--percentage-color", '"'+self.percentage_color+'"'])
+            cmd_parts.extend(["--percentage-color", self.percentage_color])
 
         if self.show_percentage:
             cmd_parts.append("--show-percentage")
         
-        if self.preview_only:
+        if self.preview_only if preview is None else preview:
             cmd_parts.append("--preview")
         
         if self.no_cleanup:
@@ -581,14 +706,17 @@ class TimeVisualizerGUI(QMainWindow):
             if self.life_expectancy != 90: 
                 cmd_parts.extend(["--life-expectancy", str(self.life_expectancy)])
         
-        return " ".join(cmd_parts)
+        return cmd_parts
+
+    def build_command(self):
+        if not self.script_path.exists():
+            return f"# Error: script.py not found at {self.script_path}"
+        return shlex.join(self.build_command_args())
     
     def build_cron_command(self):
-        base_command = self.build_command()
-        
-        if "--preview" in base_command:
-            base_command = base_command.replace("--preview", "").strip()
-            base_command = " ".join(base_command.split())
+        if not self.script_path.exists():
+            return f"# Error: script.py not found at {self.script_path}"
+        base_command = shlex.join(self.build_command_args(preview=False))
         
         freq = self.cron_frequency
         
@@ -619,6 +747,7 @@ class TimeVisualizerGUI(QMainWindow):
     def update_command_preview(self):
         command = self.build_command()
         self.command_text.setPlainText(command)
+        self.schedule_thumbnail()
     
     def update_cron_command(self):
         if hasattr(self, 'cron_command_text'):
@@ -643,10 +772,13 @@ class TimeVisualizerGUI(QMainWindow):
             ("Percentage", self.percentage_color)
         ]
         
+        # The same parser builds the render config, so anything it rejects
+        # is caught here instead of raising inside a slot.
         for color_name, color in colors:
-            color = color.strip()
-            if not color.startswith("#") or len(color) != 7:
-                return f"Invalid {color_name} color format. Please use #RRGGBB format."
+            try:
+                script.parse_color(color)
+            except ValueError as e:
+                return f"Invalid {color_name} color. {e}"
         
         return None 
     
@@ -660,21 +792,102 @@ class TimeVisualizerGUI(QMainWindow):
             QMessageBox.critical(self, "Script Not Found", 
                                f"Could not find script.py at {self.script_path}")
             return
+
+        if self.preview_only:
+            # Nothing is written or set, so there is no need for a process.
+            self.start_render()
+            return
         
-        command = self.build_command()
-        
+        self.start_run(self.build_command_args(), "run")
+
+    def render_preview(self):
+        error = self.validate_settings()
+        if error:
+            QMessageBox.critical(self, "Invalid Settings", error)
+            return
+        self.start_render()
+
+    def build_render_config(self):
+        return script.RenderConfig(
+            background=script.parse_color(self.bg_color),
+            filled_color=script.parse_color(self.filled_color),
+            hollow_color=script.parse_color(self.hollow_color),
+            percentage_color=script.parse_color(self.percentage_color),
+            show_percentage=self.show_percentage,
+            dob=self.dob,
+            life_expectancy=self.life_expectancy,
+        )
+
+    def screen_size(self):
+        screen = self.screen() or QApplication.primaryScreen()
+        geometry = screen.geometry()
+        ratio = screen.devicePixelRatio()
+        return round(geometry.width() * ratio), round(geometry.height() * ratio)
+
+    def start_render(self):
+        if self.render_worker is not None and self.render_worker.isRunning():
+            # As with script runs, only the latest request waits.
+            self.pending_render = True
+            self.preview_status.setText("Queued: starts when the current render finishes")
+            return
+
+        self.pending_render = False
+        size = self.screen_size()
+        self.preview_status.setText(f"Rendering {self.mode} at {size[0]}x{size[1]}...")
+        self.render_worker = RenderWorker(self.mode, size, self.build_render_config(), self.preview_version, self)
+        self.render_worker.rendered.connect(self.on_rendered)
+        self.render_worker.failed.connect(self.on_render_failed)
+        self.render_worker.finished.connect(self.on_render_finished)
+        self.render_worker.finished.connect(self.render_worker.deleteLater)
+        self.render_worker.start()
+
+    def show_preview_image(self, image):
+        pixmap = QPixmap.fromImage(image)
+        width = max(1, self.preview_label.width())
+        self.preview_label.setPixmap(pixmap.scaledToWidth(width, Qt.TransformationMode.SmoothTransformation))
+
+    def schedule_thumbnail(self):
+        if not hasattr(self, 'preview_timer'):
+            return
+        # Any change makes a full-size render in flight stale.
+        self.preview_version += 1
+        self.pending_render = False
+        if self.render_worker is not None:
+            self.render_worker.requestInterruption()
+        self.preview_timer.start()
+
+    def update_thumbnail(self):
+        if self.validate_settings():
+            self.preview_status.setText("Preview paused: invalid settings")
+            return
+        size = self.screen_size()
+        width = max(1, round(self.preview_label.width() * self.preview_label.devicePixelRatio()))
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                QMessageBox.information(self, "Success", 
-                                      f"Script completed successfully!\n\nOutput:\n{result.stdout}")
-            else:
-                QMessageBox.critical(self, "Error", 
-                                   f"Script failed with error:\n{result.stderr}")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to run script: {str(e)}")
+            img = script.render_thumbnail(self.mode, size, self.build_render_config(), width)
+        except ValueError as e:
+            self.preview_status.setText(f"Preview paused: {e}")
+            return
+        data = img.tobytes("raw", "RGB")
+        self.show_preview_image(QImage(data, img.width, img.height, 3 * img.width, QImage.Format.Format_RGB888))
+        self.preview_status.setText(f"Thumbnail of {self.mode} at {size[0]}x{size[1]}; "
+                                    "click Render Full Size for the exact image")
+
+    def on_rendered(self, image):
+        if self.sender().version != self.preview_version:
+            return
+        self.show_preview_image(image)
+        self.preview_status.setText(f"Rendered {self.mode} at {image.width()}x{image.height()}")
+
+    def on_render_failed(self, message):
+        if self.sender().version == self.preview_version:
+            self.preview_status.setText(f"Render failed: {message}")
+
+    def on_render_finished(self):
+        # The worker deletes itself once this returns.
+        if self.sender() is self.render_worker:
+            self.render_worker = None
+        if self.pending_render:
+            self.start_render()
     
     def copy_command(self):
         command = self.build_command()
@@ -700,23 +913,111 @@ class TimeVisualizerGUI(QMainWindow):
                                f"Could not find script.py at {self.script_path}")
             return
         
-        base_command = self.build_command()
-        if "--preview" in base_command:
-            base_command = base_command.replace("--preview", "").strip()
-            base_command = " ".join(base_command.split())
-        
-        try:
-            result = subprocess.run(base_command, shell=True, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                QMessageBox.information(self, "Test Successful", 
-                                      f"Cron command test completed successfully!\n\nOutput:\n{result.stdout}")
-            else:
-                QMessageBox.critical(self, "Test Failed", 
-                                   f"Cron command test failed with error:\n{result.stderr}")
-                
-        except Exception as e:
-            QMessageBox.critical(self, "Test Error", f"Failed to test cron command: {str(e)}")
+        self.start_run(self.build_command_args(preview=False), "test")
+
+    # Script runs go through one QProcess so the window stays responsive while
+    # it renders; output is streamed into the Output box as it arrives.
+    RUN_MESSAGES = {
+        "run": ("Success", "Script completed successfully!", "Error", "Script failed with error"),
+        "test": ("Test Successful", "Cron command test completed successfully!",
+                 "Test Failed", "Cron command test failed with error"),
+    }
+
+    def setup_process(self):
+        self.process = QProcess(self)
+        env = QProcessEnvironment.systemEnvironment()
+        env.insert("PYTHONUNBUFFERED", "1")
+        self.process.setProcessEnvironment(env)
+        self.process.readyReadStandardOutput.connect(self.on_process_output)
+        self.process.finished.connect(self.on_process_finished)
+        self.process.errorOccurred.connect(self.on_process_error)
+
+    def start_run(self, args, kind):
+        if self.process.state() != QProcess.ProcessState.NotRunning:
+            # Only the latest request waits for the running one; clicking
+            # again replaces it instead of piling up renders.
+            self.pending_run = (args, kind)
+            self.status_label.setText("Queued: starts when the current run finishes")
+            return
+
+        self.run_kind = kind
+        self.cancelled = False
+        self.run_generation += 1
+        self.run_output = ""
+        self.output_text.clear()
+        self.status_label.setText("Running...")
+        self.progress_bar.show()
+        self.cancel_btn.setEnabled(True)
+        self.process.start(args[0], args[1:])
+
+    def cancel_run(self):
+        self.pending_run = None
+        if self.process.state() == QProcess.ProcessState.NotRunning:
+            return
+        self.cancelled = True
+        self.status_label.setText("Cancelling...")
+        self.process.terminate()
+        generation = self.run_generation
+        QTimer.singleShot(3000, lambda: self.kill_if_running(generation))
+
+    def kill_if_running(self, generation):
+        # The process is reused, so only kill it if it is still running the
+        # run this timer was set for, not one started since.
+        if generation == self.run_generation and self.process.state() != QProcess.ProcessState.NotRunning:
+            self.process.kill()
+
+    def on_process_output(self):
+        text = bytes(self.process.readAllStandardOutput()).decode(errors="replace")
+        self.run_output += text
+        self.output_text.moveCursor(QTextCursor.MoveOperation.End)
+        self.output_text.insertPlainText(text)
+        self.output_text.ensureCursorVisible()
+
+    def end_run(self, status):
+        self.progress_bar.hide()
+        self.cancel_btn.setEnabled(False)
+        self.status_label.setText(status)
+        if self.pending_run:
+            # A newer request is waiting, so this result is superseded and
+            # stays in the Output box without a dialog.
+            args, kind = self.pending_run
+            self.pending_run = None
+            self.start_run(args, kind)
+            return False
+        return True
+
+    def on_process_finished(self, exit_code, exit_status):
+        errors = bytes(self.process.readAllStandardError()).decode(errors="replace")
+        if self.cancelled:
+            self.end_run("Cancelled")
+            return
+        ok = exit_status == QProcess.ExitStatus.NormalExit and exit_code == 0
+        if not self.end_run("Finished" if ok else f"Failed (exit code {exit_code})"):
+            return
+        ok_title, ok_text, error_title, error_text = self.RUN_MESSAGES[self.run_kind]
+        if ok:
+            QMessageBox.information(self, ok_title, f"{ok_text}\n\nOutput:\n{self.run_output}")
+        else:
+            QMessageBox.critical(self, error_title, f"{error_text}:\n{errors or self.run_output}")
+
+    def on_process_error(self, error):
+        if error != QProcess.ProcessError.FailedToStart:
+            return
+        if self.end_run("Failed to start"):
+            QMessageBox.critical(self, "Error", f"Failed to run script: {self.process.errorString()}")
+
+    def closeEvent(self, event):
+        self.pending_run = None
+        self.pending_render = False
+        if self.render_worker is not None:
+            # Stops within one band of rows rather than after the whole image.
+            self.render_worker.requestInterruption()
+            self.render_worker.wait()
+        if self.process.state() != QProcess.ProcessState.NotRunning:
+            self.cancelled = True
+            self.process.kill()
+            self.process.waitForFinished(1000)
+        super().closeEvent(event)
     
     def reset_defaults(self):
         self.mode = "day"
@@ -1,17 +1,48 @@
 from __future__ import annotations
 import math
 import os
-import platform
-from random import randint
-import subprocess
-import argparse
-import glob
-from datetime import date, datetime
-from typing import Tuple
-try:
-    from PIL import Image, ImageDraw, ImageFont
-except ImportError as e:
-    raise SystemExit("This script requires Pillow. Install with: pip install pillow")
+import re
+import sys
+import time
+import zlib
+import hashlib
+import importlib.util
+import io
+import json
+import struct
+from datetime import date, datetime, timedelta
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import TYPE_CHECKING, NamedTuple, Tuple
+
+if TYPE_CHECKING:
+    # Only for annotations; main() imports it when the CLI actually runs.
+    import argparse
+
+def _lazy_import(name: str):
+    # Returns the module without running it; it is loaded on first attribute
+    # access. Runs that stop at a cache hit never pay for Pillow or NumPy.
+    # None if the module is not installed.
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        spec = importlib.util.find_spec(name)
+    except ImportError:
+        spec = None
+    if spec is None:
+        return None
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# PngImagePlugin is imported where it is used: Pillow registers its formats
+# as a side effect of importing the plugins, which a lazy module would skip.
+Image = _lazy_import("PIL.Image")
+ImageDraw = _lazy_import("PIL.ImageDraw")
+ImageFont = _lazy_import("PIL.ImageFont")
+np = _lazy_import("numpy")
 
 DEFAULT_BACKGROUND = (0, 0, 0)
 DEFAULT_FILLED_COLOR = (255, 255, 255)
@@ -19,19 +50,105 @@ DEFAULT_HOLLOW_COLOR = (255, 255, 255)
 DEFAULT_PERCENTAGE_COLOR = (255, 255, 255) 
 HOLLOW_WIDTH = 3   
 MARGIN_RATIO = 0.06
-MAX_COLUMNS = 64 
+MAX_COLUMNS = 256
+SUPERSAMPLE = 16
+LANCZOS_SUPPORT = 3
+NUMPY_BYTES_PER_PIXEL = 28
 
-OUTPUT_PATH = os.path.expanduser(os.getenv("TIME_VIS_OUT", f"~/count_{randint(1000,10000)}.png"))
-CANVAS_SIZE: Tuple[int, int] | None = None
+OUTPUT_PATH = os.path.expanduser(os.environ["TIME_VIS_OUT"]) if os.getenv("TIME_VIS_OUT") else None
+OUTPUT_SLOTS = ("a", "b")
+LEGACY_OUTPUT_NAME = re.compile(r"count_\d{4}(_[A-Za-z0-9_.-]+)?\.(png|webp|bmp|svg)")
 DEFAULT_DOB_STR = os.getenv("TIME_VIS_DOB", "2010-12-22")
 DEFAULT_LIFE_EXPECTANCY_YEARS = int(os.getenv("TIME_VIS_EXPECTANCY", "90"))
+DEFAULT_RENDER_MEMORY_MB = int(os.getenv("TIME_VIS_RENDER_MEMORY_MB", "256"))
+DEFAULT_BACKEND = os.getenv("TIME_VIS_BACKEND", "pillow")
+CACHE_DIR = os.path.expanduser(os.getenv("TIME_VIS_CACHE_DIR", os.path.join(os.getenv("XDG_CACHE_HOME", "~/.cache"), "count")))
+STATE_CHUNK = "count-render-state"
+GEOMETRY_TTL = int(os.getenv("TIME_VIS_GEOMETRY_TTL", str(24 * 60 * 60)))
+BACKENDS = ("pillow", "numpy")
+FORMATS = ("png", "webp", "bmp", "svg")
+DEFAULT_COMPRESS_LEVEL = int(os.getenv("TIME_VIS_COMPRESS_LEVEL", "6"))
+THUMBNAIL_WIDTH = 480
+CANCEL_BAND_ROWS = 128
+FONT_CANDIDATES = [
+    "C:/Windows/Fonts/arial.ttf",
+    "C:/Windows/Fonts/calibri.ttf",
+    "/System/Library/Fonts/Helvetica.ttc", 
+    "/System/Library/Fonts/Arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+]
+
+STATS: dict | None = None
+
+class RenderConfig(NamedTuple):
+    # Everything that decides what a rendered image looks like. Immutable, so
+    # one instance can be shared between threads and pickled to workers.
+    background: Tuple[int, int, int] = DEFAULT_BACKGROUND
+    filled_color: Tuple[int, int, int] = DEFAULT_FILLED_COLOR
+    hollow_color: Tuple[int, int, int] = DEFAULT_HOLLOW_COLOR
+    percentage_color: Tuple[int, int, int] = DEFAULT_PERCENTAGE_COLOR
+    show_percentage: bool = False
+    hollow_width: int = HOLLOW_WIDTH
+    backend: str = DEFAULT_BACKEND
+    memory_mb: int = DEFAULT_RENDER_MEMORY_MB
+    font_path: str | None = os.getenv("TIME_VIS_FONT") or None
+    dob: str = DEFAULT_DOB_STR
+    life_expectancy: int = DEFAULT_LIFE_EXPECTANCY_YEARS
+
+DEFAULT_CONFIG = RenderConfig()
+
+def _system() -> str:
+    # Same answer as platform.system(), without importing platform, which
+    # costs more than everything else a cached run needs.
+    if sys.platform == "win32":
+        return "Windows"
+    if sys.platform == "darwin":
+        return "Darwin"
+    return os.uname().sysname
+
+def _peak_rss_kb() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak // 1024 if _system() == "Darwin" else peak
+
+@contextmanager
+def stage(name: str):
+    # Adds the wall time of the block to STATS (when --stats-json is on) and
+    # the process's peak RSS once the block has finished. Nested stages, like
+    # "resize" inside "draw", are counted in both.
+    if STATS is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase = STATS["phases"].setdefault(name, {"seconds": 0.0, "peak_rss_kb": None})
+        phase["seconds"] = round(phase["seconds"] + time.perf_counter() - start, 6)
+        phase["peak_rss_kb"] = _peak_rss_kb()
 
-BACKGROUND = DEFAULT_BACKGROUND
-FILLED_COLOR = DEFAULT_FILLED_COLOR
-HOLLOW_COLOR = DEFAULT_HOLLOW_COLOR
-PERCENTAGE_COLOR = DEFAULT_PERCENTAGE_COLOR
-DOB_STR = DEFAULT_DOB_STR
-LIFE_EXPECTANCY_YEARS = DEFAULT_LIFE_EXPECTANCY_YEARS
+def _begin_stats(**fields) -> None:
+    global STATS
+    import platform
+    STATS = {"timestamp": datetime.now().isoformat(timespec="seconds"), "host": platform.node(), "phases": {}}
+    STATS.update(fields)
+
+def _write_stats(path: str) -> None:
+    if STATS is None:
+        return
+    STATS["total_seconds"] = round(sum(p["seconds"] for name, p in STATS["phases"].items() if name != "resize"), 6)
+    STATS["peak_rss_kb"] = _peak_rss_kb()
+    try:
+        with open(os.path.expanduser(path), "a") as f:
+            f.write(json.dumps(STATS) + "\n")
+    except OSError as e:
+        print(f"Warning: Could not write stats to {path}: {e}")
 
 def parse_color(color_str: str) -> Tuple[int, int, int]:
     color_str = color_str.strip().lower()
@@ -86,29 +203,72 @@ def parse_color(color_str: str) -> Tuple[int, int, int]:
     
     raise ValueError(f"Invalid color format: '{color_str}'. Use hex (#RRGGBB or #RGB), rgb(r,g,b), r,g,b, or named colors.")
 
-def cleanup_old_wallpapers() -> None:
-    home_dir = os.path.expanduser("~")
-    
-    pattern = "count_*.png"
-    
+def slot_paths(fmt: str = "png") -> list[str]:
+    if OUTPUT_PATH:
+        return [os.path.splitext(OUTPUT_PATH)[0] + "." + fmt]
+    return [os.path.expanduser(f"~/count_{slot}.{fmt}") for slot in OUTPUT_SLOTS]
+
+def next_output_path(fmt: str = "png") -> str:
+    # The desktop only notices a new wallpaper under a new file name, so runs
+    # alternate between two fixed slots. The slot holding the current
+    # wallpaper is never overwritten, even when a preview touched the other
+    # one last; without a current wallpaper the older slot is reused.
+    def mtime(path: str) -> int:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return -1
+    slots = slot_paths(fmt)
+    entry = _load_output_index().get(current_output() or "")
+    live = {entry.get("path"), *_entry_paths(entry)} if isinstance(entry, dict) else set()
+    return min([p for p in slots if p not in live] or slots, key=mtime)
+
+def cleanup_old_wallpapers(fmt: str = "png", outputs: list[dict] | None = None) -> None:
+    # Images only ever go to the fixed slots, which are overwritten in place,
+    # so the only leftovers are slots written in another format. That is a
+    # known handful of paths; home is listed only once, before any slot
+    # exists, to sweep files from before the slots.
+    first_run = not OUTPUT_PATH and not any(os.path.exists(p) for other in FORMATS for p in slot_paths(other))
     deleted_count = 0
-    full_pattern = os.path.join(home_dir, pattern)
-    for file_path in glob.glob(full_pattern):
+    def remove(file_path: str) -> None:
+        nonlocal deleted_count
         try:
             os.remove(file_path)
             deleted_count += 1
             print(f"Deleted old wallpaper: {file_path}")
+        except FileNotFoundError:
+            pass
         except Exception as e:
             print(f"Warning: Could not delete {file_path}: {e}")
     
+    for other in FORMATS:
+        if other == fmt:
+            continue
+        for path in slot_paths(other):
+            for file_path in [path] + (output_paths(path, outputs) if outputs else []):
+                remove(file_path)
+    
+    # Before the fixed slots every run wrote ~/count_NNNN.<fmt> (plus
+    # count_NNNN_<output>.<fmt> per monitor) under a random number.
+    if first_run:
+        home = os.path.expanduser("~")
+        try:
+            names = sorted(os.listdir(home))
+        except OSError:
+            names = []
+        for name in names:
+            if LEGACY_OUTPUT_NAME.fullmatch(name):
+                remove(os.path.join(home, name))
+    
     if deleted_count > 0:
         print(f"Cleaned up {deleted_count} old wallpaper(s)")
     else:
         print("No old wallpapers found to clean up")
 
-def detect_screen_size() -> Tuple[int, int]:
+def _query_screen_size() -> Tuple[int, int] | None:
+    import subprocess
     try:
-        sysname = platform.system()
+        sysname = _system()
         if sysname == "Windows":
             import ctypes
             user32 = ctypes.windll.user32
@@ -138,113 +298,973 @@ def detect_screen_size() -> Tuple[int, int]:
                 pass
     except Exception:
         pass
-    return (1920, 1080)
+    return None
+
+def detect_screen_size() -> Tuple[int, int]:
+    return _query_screen_size() or (1920, 1080)
+
+XRANDR_OUTPUT_RE = re.compile(r"^(?P<name>\S+) connected (?P<primary>primary )?(?P<w>\d+)x(?P<h>\d+)\+(?P<x>\d+)\+(?P<y>\d+)")
+
+def _make_output(name: str, size: Tuple[int, int], position: Tuple[int, int] = (0, 0), primary: bool = True) -> dict:
+    return {"name": name, "size": tuple(size), "position": tuple(position), "primary": primary}
+
+def _query_outputs() -> list[dict] | None:
+    # Every active monitor with its current mode and place on the virtual
+    # screen; connected outputs that are switched off have no geometry.
+    import subprocess
+    try:
+        sysname = _system()
+        if sysname == "Linux":
+            out = subprocess.check_output(["xrandr"], stderr=subprocess.DEVNULL).decode()
+            outputs = []
+            for line in out.splitlines():
+                m = XRANDR_OUTPUT_RE.match(line)
+                if m:
+                    outputs.append(_make_output(m["name"], (int(m["w"]), int(m["h"])),
+                                                (int(m["x"]), int(m["y"])), bool(m["primary"])))
+            if outputs and not any(o["primary"] for o in outputs):
+                outputs[0]["primary"] = True
+            return outputs or None
+        elif sysname == "Darwin":
+            from AppKit import NSScreen  # type: ignore
+            screens = list(NSScreen.screens())
+            # Cocoa puts the origin at the bottom left of the main screen.
+            top = screens[0].frame().size.height
+            outputs = []
+            for i, screen in enumerate(screens):
+                frame = screen.frame()
+                outputs.append(_make_output(f"display{i + 1}", (int(frame.size.width), int(frame.size.height)),
+                                            (int(frame.origin.x), int(top - frame.origin.y - frame.size.height)), i == 0))
+            return outputs or None
+    except Exception:
+        pass
+    return None
+
+def detect_outputs() -> list[dict] | None:
+    outputs = _query_outputs()
+    if outputs is None:
+        size = _query_screen_size()
+        outputs = [_make_output("default", size)] if size else None
+    return outputs
+
+def primary_output(outputs: list[dict]) -> dict:
+    return next((o for o in outputs if o["primary"]), outputs[0])
+
+def _display_fingerprint() -> str:
+    # Connector hotplug state from sysfs: reading a few small files is far
+    # cheaper than forking xrandr and changes whenever a monitor comes or goes.
+    parts = []
+    try:
+        connectors = sorted(name for name in os.listdir("/sys/class/drm") if name.startswith("card") and "-" in name)
+    except OSError:
+        connectors = []
+    for name in connectors:
+        path = f"/sys/class/drm/{name}/status"
+        try:
+            with open(path) as f:
+                parts.append(f"{path}={f.read().strip()}")
+        except OSError:
+            pass
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16] if parts else ""
 
-def auto_grid(n: int, max_cols: int = MAX_COLUMNS) -> Tuple[int, int]:
+def cached_screen_outputs(refresh: bool = False) -> list[dict]:
+    # Detection forks xrandr on Linux and may run system_profiler on macOS, so
+    # the result is cached per display session until GEOMETRY_TTL expires or
+    # the connected monitors change.
+    if _system() not in ("Linux", "Darwin"):
+        return [_make_output("default", detect_screen_size())]
+
+    cache_path = os.path.join(CACHE_DIR, "geometry.json")
+    session = ":".join(os.getenv(var, "") for var in ("DISPLAY", "WAYLAND_DISPLAY", "XDG_SESSION_ID"))
+    fingerprint = _display_fingerprint()
+    try:
+        with open(cache_path) as f:
+            cache = json.load(f)
+        if not isinstance(cache, dict):
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+
+    entry = cache.get(session)
+    if (not refresh and isinstance(entry, dict) and entry.get("fingerprint") == fingerprint
+            and 0 <= time.time() - entry.get("time", 0) < GEOMETRY_TTL and entry.get("outputs")):
+        try:
+            return [_make_output(o["name"], o["size"], o["position"], o["primary"]) for o in entry["outputs"]]
+        except (KeyError, TypeError):
+            pass
+
+    outputs = detect_outputs()
+    if outputs is None:
+        return [_make_output("default", (1920, 1080))]
+    cache[session] = {"outputs": outputs, "fingerprint": fingerprint, "time": time.time()}
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not save screen geometry: {e}")
+    return outputs
+
+def cached_screen_size(refresh: bool = False) -> Tuple[int, int]:
+    return primary_output(cached_screen_outputs(refresh))["size"]
+
+@lru_cache(maxsize=1024)
+def auto_grid(n: int, aspect: float = 1.0, max_cols: int = MAX_COLUMNS) -> Tuple[int, int]:
+    # Picks the grid that gives the largest circles in an area `aspect` times
+    # as wide as it is tall. Circle diameter is min(aspect / cols, 1 / rows),
+    # which peaks where the two terms cross near sqrt(n * aspect) columns, so
+    # only the column counts either side of that crossing (and the fewest
+    # columns for the row counts either side of it) can win.
     if n <= 0:
         return (1, 1)
-    cols = min(max_cols, math.ceil(math.sqrt(n)))
-    rows = math.ceil(n / cols)
-    best = (cols, rows)
-    best_ratio = abs((cols / rows) - 1)
-    for c in range(1, min(max_cols, n) + 1):
+    limit = min(max_cols, n)
+    cols_guess = math.sqrt(n * aspect)
+    rows_guess = math.sqrt(n / aspect)
+    candidates = {math.floor(cols_guess), math.ceil(cols_guess), limit}
+    candidates.update(math.ceil(n / r) for r in (math.floor(rows_guess), math.ceil(rows_guess)) if r >= 1)
+
+    best, best_score = (1, n), None
+    for c in candidates:
+        c = max(1, min(limit, c))
         r = math.ceil(n / c)
-        ratio = abs((c / r) - 1)
-        if ratio < best_ratio:
-            best, best_ratio = (c, r), ratio
+        # Ties go to the fewest empty cells, then the shape closest to the area.
+        score = (min(aspect / c, 1 / r), -(c * r - n), -abs(c / r - aspect))
+        if best_score is None or score > best_score:
+            best, best_score = (c, r), score
     return best
 
-def get_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+def _find_font() -> str | None:
+    import subprocess
+    for font_path in FONT_CANDIDATES:
+        if os.path.exists(font_path):
+            return font_path
     try:
-        font_paths = [
-            "C:/Windows/Fonts/arial.ttf",
-            "C:/Windows/Fonts/calibri.ttf",
-            "/System/Library/Fonts/Helvetica.ttc", 
-            "/System/Library/Fonts/Arial.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-            "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-            "/usr/share/fonts/TTF/DejaVuSans.ttf",
-        ]
-        
-        for font_path in font_paths:
-            if os.path.exists(font_path):
-                return ImageFont.truetype(font_path, size)
-        
-        return ImageFont.load_default()
+        out = subprocess.check_output(["fc-match", "--format=%{file}", "sans-serif"],
+                                      stderr=subprocess.DEVNULL, timeout=5).decode().strip()
+        if out and os.path.exists(out):
+            return out
     except Exception:
-        return ImageFont.load_default()
+        pass
+    return None
 
-def draw_circles_only(count: int, filled: int, size: Tuple[int, int], show_percentage: bool = False) -> Image.Image:
-    w, h = size
-    scale = 16
-    W, H = w * scale, h * scale
+@lru_cache(maxsize=None)
+def resolve_font(font_path: str | None = None) -> str | None:
+    # An explicit --font wins; otherwise the last font found is remembered in
+    # the cache dir so later runs skip probing paths and fontconfig.
+    if font_path:
+        return font_path
+    cache_path = os.path.join(CACHE_DIR, "font.json")
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f).get("path")
+        if cached and os.path.exists(cached):
+            return cached
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    found = _find_font()
+    if found:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"path": found}, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not save font path: {e}")
+    return found
+
+@lru_cache(maxsize=32)
+def _load_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font_path, size)
 
-    img = Image.new("RGB", (W, H), BACKGROUND)
-    draw = ImageDraw.Draw(img)
-    cols, rows = auto_grid(count)
+def get_font(size: int, font_path: str | None = None) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    font_path = resolve_font(font_path)
+    if font_path:
+        try:
+            return _load_font(font_path, size)
+        except Exception:
+            pass
+    return ImageFont.load_default()
+
+def _grid_geometry(count: int, W: int, H: int) -> Tuple[int, int, float, float, float, float, int]:
     margin = int(min(W, H) * MARGIN_RATIO) 
     grid_w = W - 2 * margin
     grid_h = H - 2 * margin
+    cols, rows = auto_grid(count, grid_w / grid_h if grid_h > 0 else 1.0)
     cell_w = grid_w / cols
     cell_h = grid_h / rows
     diameter = int(min(cell_w, cell_h) * 0.8)
     radius = diameter // 2
     x0 = (W - cols * cell_w) / 2 
     y0 = (H - rows * cell_h) / 2
+    return cols, rows, x0, y0, cell_w, cell_h, radius
 
+@lru_cache(maxsize=32)
+def _circle_boxes(count: int, W: int, H: int) -> Tuple[Tuple[int, int, int, int], ...]:
+    cols, rows, x0, y0, cell_w, cell_h, radius = _grid_geometry(count, W, H)
+    boxes = []
     for i in range(count):
         r_idx = i // cols
         c_idx = i % cols
         cx = int(x0 + c_idx * cell_w + cell_w / 2)
         cy = int(y0 + r_idx * cell_h + cell_h / 2)
-        bbox = [cx - radius, cy - radius, cx + radius, cy + radius]
+        boxes.append((cx - radius, cy - radius, cx + radius, cy + radius))
+    return tuple(boxes)
+
+def _percentage_badge(count: int, filled: int, W: int, H: int, font_path: str | None = None):
+    percentage = (filled / count) * 100
+    percentage_text = f"{percentage:.1f}%"
+
+    center_x = W // 2
+    center_y = H // 2
+    
+    base_font_size = min(W, H) // 20
+    font = get_font(base_font_size, font_path)
+    
+    bbox = ImageDraw.Draw(Image.new("RGB", (1, 1))).textbbox((0, 0), percentage_text, font=font)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+    
+    text_x = center_x - text_width // 2
+    text_y = center_y - text_height // 2
+    
+    padding = int(base_font_size * 0.3)
+    bg_bbox = (
+        text_x - padding,
+        text_y - padding,
+        text_x + text_width + padding,
+        text_y + text_height + padding
+    )
+    return percentage_text, font, (text_x, text_y), bg_bbox, padding
+
+def _strip_rows(width: int, scale: int = SUPERSAMPLE, memory_mb: int = DEFAULT_RENDER_MEMORY_MB, bands: int = 3) -> int:
+    # One output row costs `scale` supersampled rows plus one row of
+    # LANCZOS's intermediate horizontal pass.
+    row_bytes = width * bands * (scale + 1)
+    return max(1, int(memory_mb * 1024 * 1024 // row_bytes) - 2 * LANCZOS_SUPPORT)
+
+def _supersample(box: Tuple[int, int, int, int], paint, bounds: Tuple[int, int, int, int] | None = None,
+                 mode: str = "RGB", fill=0, scale: int = SUPERSAMPLE, memory_mb: int = DEFAULT_RENDER_MEMORY_MB) -> Image.Image:
+    # Renders the output-space `box` by calling paint(draw, ox, oy) on a
+    # supersampled canvas whose origin sits at (ox, oy) in supersampled
+    # coordinates, one horizontal strip at a time. Strips are padded by the
+    # LANCZOS support (clamped to `bounds`, the full image, when given) so
+    # the result is identical to downsampling one full-size canvas.
+    left, top, right, bottom = box
+    bl, bt, br, bb = bounds if bounds else (-math.inf, -math.inf, math.inf, math.inf)
+    pad_left = int(max(bl, left - LANCZOS_SUPPORT))
+    pad_right = int(min(br, right + LANCZOS_SUPPORT))
+    width = (pad_right - pad_left) * scale
+
+    out = Image.new(mode, (right - left, bottom - top), fill)
+    step = _strip_rows(width, scale, memory_mb, len(mode))
+    for y in range(top, bottom, step):
+        y_end = min(bottom, y + step)
+        pad_top = int(max(bt, y - LANCZOS_SUPPORT))
+        pad_bottom = int(min(bb, y_end + LANCZOS_SUPPORT))
+
+        canvas = Image.new(mode, (width, (pad_bottom - pad_top) * scale), fill)
+        paint(ImageDraw.Draw(canvas), pad_left * scale, pad_top * scale)
+
+        src = ((left - pad_left) * scale, (y - pad_top) * scale, (right - pad_left) * scale, (y_end - pad_top) * scale)
+        with stage("resize"):
+            out.paste(canvas.resize((right - left, y_end - y), Image.LANCZOS, box=src), (0, y - top))
+        del canvas
+    return out
+
+def _badge_background(background: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    return tuple(int(c * 0.8) if c > 128 else int(c + 50) for c in background)
+
+def _scene_painter(boxes: list[Tuple[int, int, int, int]], filled: int, badge, config: RenderConfig,
+                   scale: int = SUPERSAMPLE):
+    def paint(draw: ImageDraw.ImageDraw, ox: int, oy: int) -> None:
+        cw, ch = draw.im.size
+        for i, (x1, y1, x2, y2) in enumerate(boxes):
+            if x2 < ox or x1 >= ox + cw or y2 < oy or y1 >= oy + ch:
+                continue
+            bbox = [x1 - ox, y1 - oy, x2 - ox, y2 - oy]
+            if i < filled:
+                draw.ellipse(bbox, fill=config.filled_color)
+            else:
+                draw.ellipse(bbox, outline=config.hollow_color, width=config.hollow_width * scale)
+
+        if badge:
+            percentage_text, font, (text_x, text_y), (bx1, by1, bx2, by2), padding = badge
+            draw.rounded_rectangle([bx1 - ox, by1 - oy, bx2 - ox, by2 - oy], radius=padding,
+                                   fill=_badge_background(config.background))
+            draw.text((text_x - ox, text_y - oy), percentage_text, fill=config.percentage_color, font=font)
+    return paint
+
+# Margin, in output pixels, between a glyph and the edge of its supersampled
+# canvas. Wide enough that LANCZOS never clamps at the edge for any phase.
+SPRITE_PAD = 2 * LANCZOS_SUPPORT + 1
+
+def _sprite_extent(radius: int, phase: int, scale: int) -> int:
+    return (phase + 2 * radius) // scale + 2 * LANCZOS_SUPPORT + 1
+
+@lru_cache(maxsize=256)
+def _circle_columns(radius: int, phase_x: int, filled: bool, hollow_width: int, scale: int,
+                    memory_mb: int = DEFAULT_RENDER_MEMORY_MB) -> Image.Image:
+    # Horizontal LANCZOS pass over a supersampled glyph. It only depends on
+    # the horizontal phase, so it is shared by every row of the grid, and it
+    # is row-local, so the glyph canvas can be drawn in bounded strips.
+    pad = SPRITE_PAD * scale
+    side = 2 * pad + 2 * radius + 1
+    out_w = _sprite_extent(radius, phase_x, scale)
+    left = pad - LANCZOS_SUPPORT * scale - phase_x
+    columns = Image.new("L", (out_w, side), 0)
+    step = _strip_rows(side, scale, memory_mb, bands=1) * scale
+    for top in range(0, side, step):
+        height = min(step, side - top)
+        canvas = Image.new("L", (side, height), 0)
+        draw = ImageDraw.Draw(canvas)
+        bbox = [pad, pad - top, pad + 2 * radius, pad + 2 * radius - top]
+        if filled:
+            draw.ellipse(bbox, fill=255)
+        else:
+            draw.ellipse(bbox, outline=255, width=hollow_width * scale)
+        src = (left, 0, left + out_w * scale, height)
+        with stage("resize"):
+            columns.paste(canvas.resize((out_w, height), Image.LANCZOS, box=src), (0, top))
+        del canvas, draw
+    return columns
+
+@lru_cache(maxsize=1024)
+def _circle_sprite(radius: int, phase_x: int, phase_y: int, filled: bool,
+                   hollow_width: int = HOLLOW_WIDTH, scale: int = SUPERSAMPLE,
+                   memory_mb: int = DEFAULT_RENDER_MEMORY_MB) -> Image.Image:
+    # Antialiased coverage mask for one circle whose supersampled bounding box
+    # starts `phase` pixels into an output pixel. The mask's top-left corner
+    # sits LANCZOS_SUPPORT output pixels before that pixel.
+    columns = _circle_columns(radius, phase_x, filled, hollow_width, scale, memory_mb)
+    out_h = _sprite_extent(radius, phase_y, scale)
+    top = SPRITE_PAD * scale - LANCZOS_SUPPORT * scale - phase_y
+    with stage("resize"):
+        return columns.resize((columns.width, out_h), Image.LANCZOS, box=(0, top, columns.width, top + out_h * scale))
+
+def _circle_footprint(box: Tuple[int, int, int, int], scale: int) -> Tuple[int, int, int, int]:
+    # Output-space area touched by a circle's sprite, including LANCZOS tails.
+    x1, y1, x2, y2 = box
+    radius = (x2 - x1) // 2
+    left = x1 // scale - LANCZOS_SUPPORT
+    top = y1 // scale - LANCZOS_SUPPORT
+    return (left, top, left + _sprite_extent(radius, x1 % scale, scale), top + _sprite_extent(radius, y1 % scale, scale))
+
+def _overlaps(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def _paint_grid_pillow(img: Image.Image, count: int, filled: int, size: Tuple[int, int], region: Tuple[int, int, int, int],
+                       config: RenderConfig, scale: int) -> None:
+    boxes = _circle_boxes(count, size[0] * scale, size[1] * scale)
+    cols = _grid_geometry(count, size[0] * scale, size[1] * scale)[0]
+    left, top, right, bottom = region
+    # A footprint's columns depend only on the grid column and its rows only
+    # on the grid row, so a patch visits the circles it overlaps instead of
+    # testing thousands. Row-major order keeps the paste order of a full draw.
+    footprints = [_circle_footprint(boxes[c], scale) for c in range(min(cols, count))]
+    col_hits = [c for c, (x1, _, x2, _) in enumerate(footprints) if x1 < right and left < x2]
+    footprints = [_circle_footprint(boxes[r * cols], scale) for r in range(-(-count // cols))]
+    row_hits = [r for r, (_, y1, _, y2) in enumerate(footprints) if y1 < bottom and top < y2]
+    # Every circle has the same radius, so each distinct (state, sub-pixel
+    # phase) is rasterized once and then composited through its mask.
+    for i in (r * cols + c for r in row_hits for c in col_hits):
+        if i >= count:
+            break
+        x1, y1, x2, y2 = boxes[i]
+        footprint = _circle_footprint(boxes[i], scale)
+        is_filled = i < filled
+        sprite = _circle_sprite((x2 - x1) // 2, x1 % scale, y1 % scale, is_filled, config.hollow_width, scale,
+                                config.memory_mb)
+        color = config.filled_color if is_filled else config.hollow_color
+        img.paste(color, (footprint[0] - left, footprint[1] - top), sprite)
+
+def _paint_grid_numpy(img: Image.Image, count: int, filled: int, size: Tuple[int, int], region: Tuple[int, int, int, int],
+                      config: RenderConfig, scale: int) -> None:
+    cols, rows, x0, y0, cell_w, cell_h, radius = _grid_geometry(count, size[0] * scale, size[1] * scale)
+    left, top, right, bottom = region
+
+    # Distance fields in output pixels. Pillow's ellipse covers the inclusive
+    # box cx-r..cx+r, i.e. a disc of radius r+0.5 centred on cx+0.5, and its
+    # outline grows inwards by the hollow width.
+    outer = (radius + 0.5) / scale
+    inner = outer - config.hollow_width
+    centers_x = (np.floor(x0 + np.arange(cols) * cell_w + cell_w / 2) + 0.5) / scale
+    centers_y = (np.floor(y0 + np.arange(rows) * cell_h + cell_h / 2) + 0.5) / scale
+
+    xs = (np.arange(left, right) + 0.5) * scale
+    col_of_x = np.clip(np.floor((xs - x0) / cell_w), 0, cols - 1).astype(np.int64)
+    dx2 = ((xs / scale - centers_x[col_of_x]) ** 2).astype(np.float32)
+
+    background = np.array(config.background, dtype=np.float32)
+    filled_delta = np.array(config.filled_color, dtype=np.float32) - background
+    hollow_delta = np.array(config.hollow_color, dtype=np.float32) - background
+
+    # Strip buffers are allocated once and every step works in place: per
+    # pixel three float32 fields, an int32 circle index, two masks and the
+    # uint8 strip twice (Pillow copies it), plus headroom for ufunc buffers.
+    width = right - left
+    step = max(1, min(bottom - top, config.memory_mb * 1024 * 1024 // (width * NUMPY_BYTES_PER_PIXEL)))
+    dist = np.empty((step, width), np.float32)
+    disc = np.empty((step, width), np.float32)
+    channel = np.empty((step, width), np.float32)
+    index = np.empty((step, width), np.int32)
+    is_filled = np.empty((step, width), bool)
+    is_empty = np.empty((step, width), bool)
+    out = np.empty((step, width, 3), np.uint8)
+    col_of_x = col_of_x.astype(np.int32)
+    for y in range(top, bottom, step):
+        n = min(bottom, y + step) - y
+        ys = (np.arange(y, y + n) + 0.5) * scale
+        row_of_y = np.clip(np.floor((ys - y0) / cell_h), 0, rows - 1).astype(np.int32)
+        dy2 = ((ys / scale - centers_y[row_of_y]) ** 2).astype(np.float32)
+        d, c, ch = dist[:n], disc[:n], channel[:n]
+        i, f, e, o = index[:n], is_filled[:n], is_empty[:n], out[:n]
+
+        np.add(dy2[:, None], dx2[None, :], out=d)
+        np.sqrt(d, out=d)
+        np.multiply(row_of_y[:, None], cols, out=i)
+        i += col_of_x[None, :]
+        np.less(i, filled, out=f)
+        np.greater_equal(i, count, out=e)
+        # disc = clip(outer - dist + 0.5), then the ring replaces dist.
+        np.subtract(outer, d, out=c)
+        c += 0.5
+        np.clip(c, 0, 1, out=c)
+        np.subtract(inner, d, out=d)
+        d += 0.5
+        np.clip(d, 0, 1, out=d)
+        np.subtract(c, d, out=d)
+        np.copyto(d, c, where=f)
+        d[e] = 0
+
+        for k in range(3):
+            np.multiply(d, hollow_delta[k], out=ch)
+            np.multiply(d, filled_delta[k], out=ch, where=f)
+            ch += background[k]
+            np.rint(ch, out=ch)
+            o[..., k] = ch
+        img.paste(Image.fromarray(o, "RGB"), (0, y - top))
+
+def _paint_region(img: Image.Image, region: Tuple[int, int, int, int], count: int, filled: int,
+                  config: RenderConfig = DEFAULT_CONFIG) -> None:
+    # Redraws the circles inside `region` of a full-size image from scratch.
+    left, top, right, bottom = region
+    if right <= left or bottom <= top:
+        return
+    patch = Image.new("RGB", (right - left, bottom - top), config.background)
+    if config.backend == "numpy" and np is not None:
+        _paint_grid_numpy(patch, count, filled, img.size, region, config, SUPERSAMPLE)
+    else:
+        _paint_grid_pillow(patch, count, filled, img.size, region, config, SUPERSAMPLE)
+    img.paste(patch, (left, top))
+
+def _badge_region(count: int, filled: int, size: Tuple[int, int], scale: int = SUPERSAMPLE,
+                  font_path: str | None = None):
+    w, h = size
+    badge = _percentage_badge(count, filled, w * scale, h * scale, font_path)
+    bx1, by1, bx2, by2 = badge[3]
+    region = (max(0, bx1 // scale - LANCZOS_SUPPORT), max(0, by1 // scale - LANCZOS_SUPPORT),
+              min(w, bx2 // scale + LANCZOS_SUPPORT + 1), min(h, by2 // scale + LANCZOS_SUPPORT + 1))
+    return region, badge
+
+def _paint_badge(img: Image.Image, count: int, filled: int, config: RenderConfig = DEFAULT_CONFIG) -> None:
+    scale = SUPERSAMPLE
+    w, h = img.size
+    region, badge = _badge_region(count, filled, img.size, scale, config.font_path)
+    paint = _scene_painter(_circle_boxes(count, w * scale, h * scale), filled, badge, config, scale)
+    img.paste(_supersample(region, paint, bounds=(0, 0, w, h), fill=config.background, scale=scale,
+                           memory_mb=config.memory_mb), region[:2])
+
+def draw_circles_only(count: int, filled: int, size: Tuple[int, int], config: RenderConfig = DEFAULT_CONFIG,
+                      cancelled=None) -> Image.Image | None:
+    img = Image.new("RGB", size, config.background)
+    if cancelled is None:
+        _paint_region(img, (0, 0) + tuple(size), count, filled, config)
+    else:
+        # Bands of rows, so the caller can give up between them (None is
+        # returned). Each band is painted from scratch; the image is the same.
+        for top in range(0, size[1], CANCEL_BAND_ROWS):
+            if cancelled():
+                return None
+            _paint_region(img, (0, top, size[0], min(size[1], top + CANCEL_BAND_ROWS)), count, filled, config)
+        if cancelled():
+            return None
+    if config.show_percentage and count > 0:
+        _paint_badge(img, count, filled, config)
+    return img
+
+def draw_circles_thumbnail(count: int, filled: int, size: Tuple[int, int], config: RenderConfig = DEFAULT_CONFIG,
+                           width: int = THUMBNAIL_WIDTH) -> Image.Image:
+    # Cheap preview of a `size` image: the full-size supersampled layout is
+    # scaled down to `width` pixels and drawn directly, without supersampling
+    # or LANCZOS, so circles sit where draw_circles_only puts them.
+    W, H = size
+    factor = min(1.0, width / W)
+    tw, th = max(1, round(W * factor)), max(1, round(H * factor))
+    k = factor / SUPERSAMPLE
+    boxes = [(round(x1 * k), round(y1 * k), round(x2 * k), round(y2 * k))
+             for x1, y1, x2, y2 in _circle_boxes(count, W * SUPERSAMPLE, H * SUPERSAMPLE)]
+    badge = _percentage_badge(count, filled, tw, th, config.font_path) if config.show_percentage and count > 0 else None
+    thumb_config = config._replace(hollow_width=max(1, round(config.hollow_width * factor)))
+
+    img = Image.new("RGB", (tw, th), config.background)
+    _scene_painter(boxes, filled, badge, thumb_config, 1)(ImageDraw.Draw(img), 0, 0)
+    return img
+
+def _svg_color(color: Tuple[int, int, int]) -> str:
+    return "#{:02x}{:02x}{:02x}".format(*color)
+
+def _svg_num(value: float) -> str:
+    return f"{value:.3f}".rstrip("0").rstrip(".")
+
+def draw_circles_svg(count: int, filled: int, size: Tuple[int, int], config: RenderConfig = DEFAULT_CONFIG) -> str:
+    # The layout is computed at the supersampled scale and divided back down,
+    # so every circle lands exactly where the PNG path draws it.
+    W, H = size
+    scale = SUPERSAMPLE
+    n = _svg_num
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}">',
+             f'<rect width="{W}" height="{H}" fill="{_svg_color(config.background)}"/>']
+
+    solid, hollow = [], []
+    for i, (x1, y1, x2, y2) in enumerate(_circle_boxes(count, W * scale, H * scale)):
+        cx, cy, r = (x1 + x2 + 1) / 2 / scale, (y1 + y2 + 1) / 2 / scale, (x2 - x1 + 1) / 2 / scale
         if i < filled:
-            draw.ellipse(bbox, fill=FILLED_COLOR)
+            solid.append(f'<circle cx="{n(cx)}" cy="{n(cy)}" r="{n(r)}"/>')
         else:
-            draw.ellipse(bbox, outline=HOLLOW_COLOR, width=HOLLOW_WIDTH * scale)
+            # Pillow draws outlines inside the box; SVG strokes are centred.
+            hollow.append(f'<circle cx="{n(cx)}" cy="{n(cy)}" r="{n(r - config.hollow_width / 2)}"/>')
+    if solid:
+        parts.append(f'<g fill="{_svg_color(config.filled_color)}">' + "".join(solid) + "</g>")
+    if hollow:
+        parts.append(f'<g fill="none" stroke="{_svg_color(config.hollow_color)}" stroke-width="{config.hollow_width}">'
+                     + "".join(hollow) + "</g>")
 
-    if show_percentage and count > 0:
-        percentage = (filled / count) * 100
-        percentage_text = f"{percentage:.1f}%"
+    if config.show_percentage and count > 0:
+        percentage_text, font, _, (bx1, by1, bx2, by2), padding = _percentage_badge(count, filled, W * scale, H * scale,
+                                                                                     config.font_path)
+        family = font.getname()[0] if hasattr(font, "getname") else "sans-serif"
+        font_size = getattr(font, "size", min(W, H) * scale // 20) / scale
+        parts.append(f'<rect x="{n(bx1 / scale)}" y="{n(by1 / scale)}" width="{n((bx2 - bx1) / scale)}" '
+                     f'height="{n((by2 - by1) / scale)}" rx="{n(padding / scale)}" fill="{_svg_color(_badge_background(config.background))}"/>')
+        parts.append(f'<text x="{n((bx1 + bx2) / 2 / scale)}" y="{n((by1 + by2) / 2 / scale)}" '
+                     f'font-family="{family}, sans-serif" font-size="{n(font_size)}" fill="{_svg_color(config.percentage_color)}" '
+                     f'text-anchor="middle" dominant-baseline="central">{percentage_text}</text>')
+    parts.append("</svg>")
+    return "\n".join(parts) + "\n"
 
-        center_x = W // 2
-        center_y = H // 2
-        
-        base_font_size = min(W, H) // 20
-        font = get_font(base_font_size)
-        
-        bbox = draw.textbbox((0, 0), percentage_text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        text_x = center_x - text_width // 2
-        text_y = center_y - text_height // 2
-        
-        padding = int(base_font_size * 0.3)
-        bg_bbox = [
-            text_x - padding,
-            text_y - padding,
-            text_x + text_width + padding,
-            text_y + text_height + padding
-        ]
-        
-        bg_color = tuple(int(c * 0.8) if c > 128 else int(c + 50) for c in BACKGROUND)
-        draw.rounded_rectangle(bg_bbox, radius=padding, fill=bg_color)
-        
-        draw.text((text_x, text_y), percentage_text, fill=PERCENTAGE_COLOR, font=font)
+def _dirty_regions(count: int, old_filled: int, filled: int, size: Tuple[int, int],
+                   config: RenderConfig = DEFAULT_CONFIG) -> list[Tuple[int, int, int, int]]:
+    # Output-pixel areas whose content differs between the two fill levels:
+    # the circles that changed state and the old percentage badge.
+    scale = SUPERSAMPLE
+    boxes = _circle_boxes(count, size[0] * scale, size[1] * scale)
+    lo, hi = sorted((max(0, min(old_filled, count)), max(0, min(filled, count))))
+    dirty = [_circle_footprint(boxes[i], scale) for i in range(lo, hi)]
+    if config.show_percentage and count > 0 and old_filled != filled:
+        dirty.append(_badge_region(count, old_filled, size, scale, config.font_path)[0])
+    return dirty
+
+def changed_box(count: int, old_filled: int, filled: int, size: Tuple[int, int],
+                config: RenderConfig = DEFAULT_CONFIG) -> Tuple[int, int, int, int] | None:
+    # Bounding box of everything update_circles repaints, including the new
+    # badge, which may be wider than the old one.
+    dirty = _dirty_regions(count, old_filled, filled, size, config)
+    if config.show_percentage and count > 0 and old_filled != filled:
+        dirty.append(_badge_region(count, filled, size, font_path=config.font_path)[0])
+    if not dirty:
+        return None
+    w, h = size
+    return (max(0, min(d[0] for d in dirty)), max(0, min(d[1] for d in dirty)),
+            min(w, max(d[2] for d in dirty)), min(h, max(d[3] for d in dirty)))
+
+def update_circles(img: Image.Image, count: int, old_filled: int, filled: int,
+                   config: RenderConfig = DEFAULT_CONFIG) -> Image.Image:
+    # Patches an image previously drawn with `old_filled` so that it matches
+    # draw_circles_only(count, filled, ...): only the circles that changed
+    # state, and the percentage badge, are redrawn.
+    w, h = img.size
+    for left, top, right, bottom in _dirty_regions(count, old_filled, filled, img.size, config):
+        _paint_region(img, (max(0, left), max(0, top), min(w, right), min(h, bottom)), count, filled, config)
 
-    img = img.resize((w, h), Image.LANCZOS)
+    if config.show_percentage and count > 0 and old_filled != filled:
+        _paint_badge(img, count, filled, config)
     return img
 
+def _render_key(mode: str, count: int, size: Tuple[int, int], config: RenderConfig) -> dict:
+    return {
+        "mode": mode,
+        "count": count,
+        "size": list(size),
+        "background": list(config.background),
+        "filled_color": list(config.filled_color),
+        "hollow_color": list(config.hollow_color),
+        "percentage_color": list(config.percentage_color),
+        "show_percentage": config.show_percentage,
+        "hollow_width": config.hollow_width,
+        "backend": config.backend,
+        "font": resolve_font(config.font_path) if config.show_percentage else None,
+        "grid": list(_grid_geometry(count, size[0] * SUPERSAMPLE, size[1] * SUPERSAMPLE)[:2]),
+    }
 
-def view_day() -> Tuple[int, int]:
-    now = datetime.now()
+def render_incremental(mode: str, count: int, filled: int, size: Tuple[int, int],
+                       config: RenderConfig = DEFAULT_CONFIG) -> Image.Image:
+    # The last frame for each mode is kept in the cache directory with its
+    # layout key stored in a PNG text chunk. When the key still matches, only
+    # the circles whose state changed since then are redrawn.
+    state_path = os.path.join(CACHE_DIR, f"render_{mode}_{size[0]}x{size[1]}.png")
+    key = _render_key(mode, count, size, config)
+
+    img = None
+    try:
+        with Image.open(state_path) as prev:
+            state = json.loads(prev.text.get(STATE_CHUNK, "{}"))
+            if state.get("key") == key and prev.size == tuple(size):
+                img = prev.convert("RGB")
+                old_filled = int(state["filled"])
+    except (OSError, ValueError, KeyError):
+        img = None
+
+    if img is None:
+        img = draw_circles_only(count, filled, size, config)
+    elif old_filled != filled:
+        update_circles(img, count, old_filled, filled, config)
+        print(f"Incremental update: {abs(filled - old_filled)} circle(s) redrawn")
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        from PIL import PngImagePlugin
+        info = PngImagePlugin.PngInfo()
+        info.add_text(STATE_CHUNK, json.dumps({"key": key, "filled": filled}))
+        tmp_path = f"{state_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, format="PNG", pnginfo=info, compress_level=1)
+        os.replace(tmp_path, state_path)
+    except OSError as e:
+        print(f"Warning: Could not save render state: {e}")
+    return img
+
+
+def output_key(mode: str, count: int, filled: int, size: Tuple[int, int], config: RenderConfig,
+               outputs: list[dict] | None = None, fmt: str = "png", encoder: dict | None = None) -> str:
+    key = _render_key(mode, count, size, config)
+    key["filled"] = filled
+    key["format"] = fmt
+    if fmt != "svg":
+        key["encoder"] = encoder
+    if outputs:
+        key["outputs"] = [[o["name"], *o["size"], *o["position"]] for o in outputs]
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+def _load_output_index() -> dict:
+    try:
+        with open(os.path.join(CACHE_DIR, "outputs.json")) as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _entry_paths(entry: dict) -> list[str]:
+    return entry.get("paths") or [entry.get("path", "")]
+
+def lookup_output(key: str) -> dict | None:
+    entry = _load_output_index().get(key)
+    if isinstance(entry, dict) and all(os.path.exists(p) for p in _entry_paths(entry)):
+        return entry
+    return None
+
+def current_output() -> str | None:
+    # Key of the image that is on screen now: the last one set as the
+    # wallpaper, as long as its files have not been overwritten since.
+    current = _load_output_index().get("current")
+    return current if isinstance(current, str) else None
+
+def record_output(key: str, path: str, wallpaper: bool, paths: list[str] | None = None) -> None:
+    # Entries whose files have since been cleaned up or overwritten are
+    # dropped on write. Multi-monitor renders list every per-output image
+    # under "paths". `wallpaper` makes this key the current one.
+    paths = paths or [path]
+    old = _load_output_index()
+    index = {k: v for k, v in old.items()
+             if isinstance(v, dict) and all(os.path.exists(p) for p in _entry_paths(v))
+             and not set(_entry_paths(v)) & set(paths)}
+    index[key] = {"path": path}
+    if len(paths) > 1:
+        index[key]["paths"] = paths
+    current = key if wallpaper else old.get("current")
+    if current in index:
+        index["current"] = current
+    _save_output_index(index)
+
+def set_current_output(key: str | None) -> None:
+    # Records that `key` is now the wallpaper; None means an image outside
+    # the index is.
+    index = _load_output_index()
+    if key in index and key != "current":
+        index["current"] = key
+    else:
+        index.pop("current", None)
+    _save_output_index(index)
+
+def _save_output_index(index: dict) -> None:
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = os.path.join(CACHE_DIR, f"outputs.json.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(CACHE_DIR, "outputs.json"))
+    except OSError as e:
+        print(f"Warning: Could not update output cache: {e}")
+
+def _frame_dir(mode: str, count: int, size: Tuple[int, int], config: RenderConfig, fmt: str,
+               encoder: dict | None) -> str:
+    key = _render_key(mode, count, size, config)
+    key["format"] = fmt
+    key["encoder"] = encoder
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, "frames", digest)
+
+def frame_path(mode: str, count: int, filled: int, size: Tuple[int, int], config: RenderConfig,
+               fmt: str = "png", encoder: dict | None = None) -> str | None:
+    path = os.path.join(_frame_dir(mode, count, size, config, fmt, encoder), f"{filled}.{fmt}")
+    return path if os.path.exists(path) else None
+
+def prerender_frames(mode: str, count: int, size: Tuple[int, int], config: RenderConfig,
+                     fmt: str = "png", encoder: dict | None = None) -> str:
+    # Stores every state of a view (0..count filled) as frames/<key>/<filled>.<fmt>.
+    # Consecutive frames differ in one circle and the badge, so each frame is
+    # patched from the previous one instead of being drawn from scratch.
+    frame_dir = _frame_dir(mode, count, size, config, fmt, encoder)
+    os.makedirs(frame_dir, exist_ok=True)
+    img = None
+    for filled in range(count + 1):
+        if img is None:
+            img = draw_circles_only(count, 0, size, config)
+        else:
+            update_circles(img, count, filled - 1, filled, config)
+        save_output(img, os.path.join(frame_dir, f"{filled}.{fmt}"), fmt, encoder, config)
+        if filled == count or (filled + 1) % max(1, (count + 1) // 10) == 0:
+            print(f"Pre-rendered {filled + 1}/{count + 1} frames", flush=True)
+
+    index = {"mode": mode, "count": count, "size": list(size), "format": fmt, "time": time.time()}
+    with open(os.path.join(frame_dir, "index.json"), "w") as f:
+        json.dump(index, f)
+
+    # Older frame sets for the same mode and size (other colors, counts or
+    # options) are dropped so the store stays one set per view and screen.
+    root = os.path.dirname(frame_dir)
+    for name in os.listdir(root):
+        other = os.path.join(root, name)
+        if other == frame_dir:
+            continue
+        try:
+            with open(os.path.join(other, "index.json")) as f:
+                other_index = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if other_index.get("mode") == mode and other_index.get("size") == list(size):
+            import shutil
+            shutil.rmtree(other, ignore_errors=True)
+    return frame_dir
+
+# Animated export. Pillow's GIF and APNG writers keep every frame until the
+# end, so these writers stream instead: each frame is encoded as soon as it
+# is drawn, and only the rectangle that changed since the previous frame is
+# stored. Memory stays at one canvas however many frames there are.
+
+def _png_chunks(data: bytes):
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+def _png_chunk(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", len(payload)) + kind + payload + struct.pack(">I", zlib.crc32(kind + payload))
+
+class ApngWriter:
+    def __init__(self, path: str, size: Tuple[int, int], frames: int, fps: float, encoder: dict | None = None,
+                 config: RenderConfig = DEFAULT_CONFIG):
+        self.f = open(path, "wb")
+        self.frames, self.sequence, self.index = frames, 0, 0
+        from fractions import Fraction
+        # fcTL stores the frame delay as a fraction of two 16-bit fields.
+        delay = Fraction(1 / fps).limit_denominator(65535)
+        self.delay = (min(delay.numerator, 65535), delay.denominator)
+        self.compress_level = (encoder or {}).get("compress_level", DEFAULT_COMPRESS_LEVEL)
+
+    def add(self, img: Image.Image, box: Tuple[int, int, int, int]) -> None:
+        buf = io.BytesIO()
+        img.crop(box).save(buf, format="PNG", compress_level=self.compress_level)
+        chunks = list(_png_chunks(buf.getvalue()))
+        if self.index == 0:
+            self.f.write(b"\x89PNG\r\n\x1a\n")
+            ihdr = next(payload for kind, payload in chunks if kind == b"IHDR")
+            self.f.write(_png_chunk(b"IHDR", ihdr))
+            self.f.write(_png_chunk(b"acTL", struct.pack(">II", self.frames, 0)))
+        x1, y1, x2, y2 = box
+        self.f.write(_png_chunk(b"fcTL", struct.pack(">IIIIIHHBB", self.sequence, x2 - x1, y2 - y1, x1, y1,
+                                                     *self.delay, 0, 0)))
+        self.sequence += 1
+        for kind, payload in chunks:
+            if kind != b"IDAT":
+                continue
+            if self.index == 0:
+                self.f.write(_png_chunk(b"IDAT", payload))
+            else:
+                self.f.write(_png_chunk(b"fdAT", struct.pack(">I", self.sequence) + payload))
+                self.sequence += 1
+        self.index += 1
+
+    def close(self) -> None:
+        self.f.write(_png_chunk(b"IEND", b""))
+        self.f.close()
+
+class GifWriter:
+    def __init__(self, path: str, size: Tuple[int, int], frames: int, fps: float, encoder: dict | None = None,
+                 config: RenderConfig = DEFAULT_CONFIG):
+        # Every frame shares one global table: the fixed palette of the scene.
+        self.palette = _fixed_palette(config.background, config.filled_color, config.hollow_color, config.percentage_color)
+        table = bytes(self.palette.getpalette("RGB")[:768]).ljust(768, b"\0")
+        self.delay = min(65535, max(2, round(100 / fps)))
+        self.f = open(path, "wb")
+        self.f.write(b"GIF89a" + struct.pack("<HHBBB", size[0], size[1], 0xF7, 0, 0) + table)
+        self.f.write(b"\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00")
+
+    def add(self, img: Image.Image, box: Tuple[int, int, int, int]) -> None:
+        buf = io.BytesIO()
+        frame = img.crop(box).quantize(palette=self.palette, dither=Image.Dither.NONE)
+        frame.save(buf, format="GIF", optimize=False, interlace=False)
+        data = buf.getvalue()
+        pos = 13 + ((3 << ((data[10] & 7) + 1)) if data[10] & 0x80 else 0)
+        while data[pos] == 0x21:
+            pos += 2
+            while data[pos]:
+                pos += data[pos] + 1
+            pos += 1
+        flags = data[pos + 9]
+        pos += 10 + ((3 << ((flags & 7) + 1)) if flags & 0x80 else 0)
+        end = pos + 1
+        while data[end]:
+            end += data[end] + 1
+        x1, y1, x2, y2 = box
+        # Disposal 1 keeps the previous frame under the changed rectangle.
+        self.f.write(b"\x21\xf9\x04" + struct.pack("<BHBB", 1 << 2, self.delay, 0, 0))
+        self.f.write(b"\x2c" + struct.pack("<HHHHB", x1, y1, x2 - x1, y2 - y1, 0) + data[pos:end + 1])
+
+    def close(self) -> None:
+        self.f.write(b"\x3b")
+        self.f.close()
+
+class WebpWriter:
+    def __init__(self, path: str, size: Tuple[int, int], frames: int, fps: float, encoder: dict | None = None,
+                 config: RenderConfig = DEFAULT_CONFIG):
+        self.f = open(path, "wb")
+        self.duration = min(0xFFFFFF, max(1, round(1000 / fps)))
+        self.method = 6 if (encoder or {}).get("optimize") else 0
+        self.f.write(b"RIFF\0\0\0\0WEBP")
+        self._chunk(b"VP8X", struct.pack("<I", 0x02) + (size[0] - 1).to_bytes(3, "little") + (size[1] - 1).to_bytes(3, "little"))
+        self._chunk(b"ANIM", bytes((*reversed(config.background), 255)) + struct.pack("<H", 0))
+
+    def _chunk(self, kind: bytes, payload: bytes) -> None:
+        self.f.write(kind + struct.pack("<I", len(payload)) + payload + (b"\0" if len(payload) % 2 else b""))
+
+    def add(self, img: Image.Image, box: Tuple[int, int, int, int]) -> None:
+        # Frame offsets are stored halved, so the rectangle starts on even pixels.
+        x1, y1, x2, y2 = box[0] & ~1, box[1] & ~1, box[2], box[3]
+        buf = io.BytesIO()
+        img.crop((x1, y1, x2, y2)).save(buf, format="WEBP", lossless=True, method=self.method)
+        data = buf.getvalue()
+        pos, frame = 12, b""
+        while pos < len(data):
+            kind, length = data[pos:pos + 4], struct.unpack("<I", data[pos + 4:pos + 8])[0]
+            if kind in (b"VP8L", b"VP8 ", b"ALPH"):
+                frame += data[pos:pos + 8 + length + (length & 1)]
+            pos += 8 + length + (length & 1)
+        header = b"".join(v.to_bytes(3, "little") for v in (x1 // 2, y1 // 2, x2 - x1 - 1, y2 - y1 - 1, self.duration))
+        self._chunk(b"ANMF", header + b"\x02" + frame)
+
+    def close(self) -> None:
+        size = self.f.tell()
+        self.f.seek(4)
+        self.f.write(struct.pack("<I", size - 8))
+        self.f.close()
+
+class FrameSequenceWriter:
+    def __init__(self, path: str, size: Tuple[int, int], frames: int, fps: float, encoder: dict | None = None,
+                 config: RenderConfig = DEFAULT_CONFIG):
+        os.makedirs(path, exist_ok=True)
+        self.path, self.encoder, self.config, self.index = path, encoder, config, 0
+        self.digits = max(4, len(str(frames - 1)))
+
+    def add(self, img: Image.Image, box: Tuple[int, int, int, int]) -> None:
+        save_output(img, os.path.join(self.path, f"frame_{self.index:0{self.digits}d}.png"), "png", self.encoder,
+                    self.config)
+        self.index += 1
+
+    def close(self) -> None:
+        pass
+
+ANIMATION_WRITERS = {".png": ApngWriter, ".apng": ApngWriter, ".gif": GifWriter, ".webp": WebpWriter}
+
+def export_animation(mode: str, path: str, size: Tuple[int, int], config: RenderConfig = DEFAULT_CONFIG,
+                     fps: float = 12, encoder: dict | None = None) -> int:
+    # One frame per fill level of the mode's current count, from empty to
+    # full. A path without a known extension becomes a PNG frame directory.
+    count, _ = evaluate_view(mode, config)
+    writer_class = ANIMATION_WRITERS.get(os.path.splitext(path)[1].lower(), FrameSequenceWriter)
+    # Single-file animations are streamed to a temporary file and renamed
+    # into place, so a failed export leaves no truncated file behind.
+    out_path = path
+    if writer_class is not FrameSequenceWriter:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        out_path = f"{path}.{os.getpid()}.tmp"
+    writer = writer_class(out_path, size, count + 1, fps, encoder, config)
+    try:
+        try:
+            img = draw_circles_only(count, 0, size, config)
+            writer.add(img, (0, 0) + tuple(size))
+            for filled in range(1, count + 1):
+                box = changed_box(count, filled - 1, filled, size, config)
+                update_circles(img, count, filled - 1, filled, config)
+                writer.add(img, box)
+                if filled == count or filled % max(1, count // 10) == 0:
+                    print(f"Exported {filled + 1}/{count + 1} frames", flush=True)
+        finally:
+            writer.close()
+        if out_path != path:
+            os.replace(out_path, path)
+    except BaseException:
+        if out_path != path:
+            try:
+                os.remove(out_path)
+            except OSError:
+                pass
+        raise
+    return count + 1
+
+def copy_output(src: str, path: str) -> None:
+    import shutil
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, path)
+
+def _days_in_month(year: int, month: int) -> int:
+    if month == 2:
+        return 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28
+    return 30 if month in (4, 6, 9, 11) else 31
+
+def view_day(now: datetime | None = None) -> Tuple[int, int]:
+    now = now or datetime.now()
     count = 24
     filled = now.hour
     return count, filled
 
-def view_day_5min() -> Tuple[int, int]:
-    now = datetime.now()
+def view_day_5min(now: datetime | None = None) -> Tuple[int, int]:
+    now = now or datetime.now()
     count = 24 * 12 
 
     hours_passed = now.hour
@@ -256,19 +1276,17 @@ def view_day_5min() -> Tuple[int, int]:
     
     return count, filled
 
-def view_month_day() -> Tuple[int, int]:
-    today = date.today()
-    first_next_month = date(today.year + (today.month // 12), ((today.month % 12) + 1), 1)
-    days_in_month = (first_next_month - date(today.year, today.month, 1)).days
+def view_month_day(now: datetime | None = None) -> Tuple[int, int]:
+    today = (now or datetime.now()).date()
+    days_in_month = _days_in_month(today.year, today.month)
     filled = today.day - 1 
     return days_in_month, filled
 
-def view_month_hours() -> Tuple[int, int]:
-    today = date.today()
-    now = datetime.now()
+def view_month_hours(now: datetime | None = None) -> Tuple[int, int]:
+    now = now or datetime.now()
+    today = now.date()
     
-    first_next_month = date(today.year + (today.month // 12), ((today.month % 12) + 1), 1)
-    days_in_month = (first_next_month - date(today.year, today.month, 1)).days
+    days_in_month = _days_in_month(today.year, today.month)
     total_hours = days_in_month * 24
     
     days_completed = today.day - 1  
@@ -276,17 +1294,15 @@ def view_month_hours() -> Tuple[int, int]:
     
     return total_hours, hours_completed
 
-def view_year_months() -> Tuple[int, int]:
-    now = date.today()
-    filled = now.month - 1
+def view_year_months(now: datetime | None = None) -> Tuple[int, int]:
+    today = (now or datetime.now()).date()
+    filled = today.month - 1
     return 12, filled
 
-def view_year_days() -> Tuple[int, int]:
-    today = date.today()
-    start_of_year = date(today.year, 1, 1)
-    day_of_year = (today - start_of_year).days
-    start_next_year = date(today.year + 1, 1, 1)
-    days_in_year = (start_next_year - start_of_year).days
+def view_year_days(now: datetime | None = None) -> Tuple[int, int]:
+    today = (now or datetime.now()).date()
+    day_of_year = today.timetuple().tm_yday - 1
+    days_in_year = 337 + _days_in_month(today.year, 2)
     return days_in_year, day_of_year
 
 def parse_dob(dob_str: str) -> date:
@@ -296,18 +1312,20 @@ def parse_dob(dob_str: str) -> date:
     except Exception as e:
         raise ValueError("DOB must be YYYY-MM-DD format, e.g., '2008-01-01'")
 
-def view_lifetime_years() -> Tuple[int, int]:
-    today = date.today()
-    dob = parse_dob(DOB_STR)
-    total = LIFE_EXPECTANCY_YEARS
+def view_lifetime_years(now: datetime | None = None, dob_str: str = DEFAULT_DOB_STR,
+                        life_expectancy: int = DEFAULT_LIFE_EXPECTANCY_YEARS) -> Tuple[int, int]:
+    today = (now or datetime.now()).date()
+    dob = parse_dob(dob_str)
+    total = life_expectancy
     lived = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
     lived = max(0, min(lived, total))
     return total, lived
 
-def view_lifetime_months() -> Tuple[int, int]:
-    today = date.today()
-    dob = parse_dob(DOB_STR)
-    total = LIFE_EXPECTANCY_YEARS * 12
+def view_lifetime_months(now: datetime | None = None, dob_str: str = DEFAULT_DOB_STR,
+                         life_expectancy: int = DEFAULT_LIFE_EXPECTANCY_YEARS) -> Tuple[int, int]:
+    today = (now or datetime.now()).date()
+    dob = parse_dob(dob_str)
+    total = life_expectancy * 12
     lived = (today.year - dob.year) * 12 + (today.month - dob.month)
     if today.day < dob.day:
         lived -= 1
@@ -324,42 +1342,414 @@ VIEW_MAP = {
     "lifetime-years": view_lifetime_years,
     "lifetime-months": view_lifetime_months,
 }
+BUILTIN_VIEWS = tuple(VIEW_MAP)
+LIFETIME_VIEWS = (view_lifetime_years, view_lifetime_months)
+
+DEFAULT_VIEWS_PATH = os.path.expanduser(os.environ["TIME_VIS_VIEWS"]) if os.getenv("TIME_VIS_VIEWS") else None
+VIEW_PERIODS = ("day", "week", "month", "quarter", "year")
+# Longest length of each calendar period, which offsets must fit in.
+PERIOD_SECONDS = {"day": 86400, "week": 7 * 86400, "month": 31 * 86400, "quarter": 92 * 86400, "year": 366 * 86400}
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+DURATION_PART = re.compile(r"(\d+)\s*([smhdw])")
+
+def _days_from_civil(year: int, month: int, day: int) -> int:
+    # Days since 1970-01-01 in the proleptic Gregorian calendar, counting
+    # years from March so the leap day falls at the end (H. Hinnant).
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + (-3 if month > 2 else 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+def _civil_from_days(days: int) -> Tuple[int, int, int]:
+    days += 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524 - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    mp = (5 * day_of_year + 2) // 153
+    month = mp + (3 if mp < 10 else -9)
+    return year_of_era + era * 400 + (month <= 2), month, day_of_year - (153 * mp + 2) // 5 + 1
+
+def parse_duration(text) -> int:
+    # "15m", "1h30m", "14d", "2w" or a number of seconds.
+    if isinstance(text, int) and not isinstance(text, bool):
+        return text
+    text = str(text).strip().lower()
+    if text.isdigit():
+        return int(text)
+    parts = DURATION_PART.findall(text)
+    if not parts or DURATION_PART.sub("", text).strip():
+        raise ValueError(f"invalid duration '{text}'. Use e.g. 15m, 1h30m, 14d or 2w")
+    return sum(int(n) * DURATION_UNITS[unit] for n, unit in parts)
+
+def _parse_offset(text) -> int:
+    # An offset into a period: "09:30" or "09:30:15" on the clock, else a duration.
+    if isinstance(text, str) and ":" in text:
+        parts = text.strip().split(":")
+        fields = [int(p) for p in parts] if all(p.isdigit() for p in parts) else []
+        if (len(fields) not in (2, 3) or max(fields[1:]) > 59 or fields[0] > 24
+                or (fields[0] == 24 and any(fields[1:]))):
+            raise ValueError(f"invalid time '{text}'. Use HH:MM or HH:MM:SS from 00:00 to 24:00")
+        return fields[0] * 3600 + fields[1] * 60 + (fields[2] if len(fields) == 3 else 0)
+    return parse_duration(text)
+
+class CompiledView:
+    # A declarative view spec reduced to integer arithmetic on wall-clock
+    # seconds since the epoch in the spec's timezone. One unit is one circle;
+    # the window runs from `start` to `end` inside each period (a calendar
+    # period or every N seconds from `anchor`), or once between two fixed
+    # dates when there is no period. Evaluating a view builds no date objects
+    # beyond reading `now`, so views with thousands of units cost the same.
+    def __init__(self, spec: dict):
+        if not isinstance(spec, dict):
+            raise ValueError("a view spec must be a JSON object")
+        self.name = str(spec.get("name", "")).strip().lower()
+        if not self.name:
+            raise ValueError("a view spec needs a name")
+        self.spec = dict(spec)
+        self.tz = None
+        if spec.get("timezone"):
+            import zoneinfo
+            try:
+                self.tz = zoneinfo.ZoneInfo(spec["timezone"])
+            except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+                raise ValueError(f"unknown timezone '{spec['timezone']}'")
+        if "unit" not in spec:
+            raise ValueError(f"view '{self.name}' needs a unit, e.g. \"unit\": \"15m\"")
+        self.unit = parse_duration(spec["unit"])
+        if self.unit <= 0:
+            raise ValueError(f"view '{self.name}': the unit must be positive")
+
+        period = spec.get("period")
+        self.period = self.every = self.anchor = None
+        if period is None:
+            # A fixed window between two dates, e.g. a deadline countdown.
+            if not spec.get("start") or not spec.get("end"):
+                raise ValueError(f"view '{self.name}' needs a period, or a fixed start and end date")
+            self.start, self.end = self._parse_date(spec["start"]), self._parse_date(spec["end"])
+        else:
+            if str(period).lower() in VIEW_PERIODS:
+                self.period = str(period).lower()
+            else:
+                self.every = parse_duration(period)
+                if self.every <= 0:
+                    raise ValueError(f"view '{self.name}': the period must be positive")
+                if not spec.get("anchor"):
+                    raise ValueError(f"view '{self.name}' needs an anchor date where its first {period} period begins")
+                self.anchor = self._parse_date(spec["anchor"])
+            self.start = _parse_offset(spec.get("start", 0))
+            self.end = _parse_offset(spec["end"]) if spec.get("end") is not None else None
+        if self.end is not None and self.end <= self.start:
+            raise ValueError(f"view '{self.name}': the end must come after the start")
+        if self.period is None and self.every is None:
+            window = self.end - self.start
+        else:
+            length = self.every or PERIOD_SECONDS[self.period]
+            if self.start >= length or (self.end is not None and self.end > length):
+                raise ValueError(f"view '{self.name}': the start and end must fall within one {period} period")
+            window = (length if self.end is None else self.end) - self.start
+        if self.unit > window:
+            raise ValueError(f"view '{self.name}': the unit is longer than the window it counts")
+
+    def _parse_date(self, text) -> int:
+        try:
+            moment = datetime.fromisoformat(str(text))
+        except ValueError:
+            raise ValueError(f"view '{self.name}': invalid date '{text}'. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM")
+        if moment.tzinfo is not None:
+            moment = moment.astimezone(self.tz).replace(tzinfo=None)
+        return self._wall(moment)
+
+    @staticmethod
+    def _wall(moment: datetime) -> int:
+        return (_days_from_civil(moment.year, moment.month, moment.day) * 86400
+                + moment.hour * 3600 + moment.minute * 60 + moment.second)
+
+    def _now(self, now: datetime | None) -> int:
+        # Naive datetimes are local time, as everywhere else in this script.
+        if self.tz is None:
+            return self._wall(now or datetime.now())
+        return self._wall(now.astimezone(self.tz) if now else datetime.now(self.tz))
+
+    def _datetime(self, wall: int) -> datetime:
+        year, month, day = _civil_from_days(wall // 86400)
+        seconds = wall % 86400
+        moment = datetime(year, month, day, seconds // 3600, seconds // 60 % 60, seconds % 60)
+        if self.tz is not None:
+            moment = moment.replace(tzinfo=self.tz).astimezone().replace(tzinfo=None)
+        return moment
+
+    def _period(self, wall: int) -> Tuple[int, int | None]:
+        # Start and end of the period containing `wall`; the end is None for
+        # a fixed window, which has no period.
+        if self.every:
+            first = self.anchor + (wall - self.anchor) // self.every * self.every
+            return first, first + self.every
+        if self.period is None:
+            return 0, None
+        days = wall // 86400
+        if self.period == "day":
+            return days * 86400, (days + 1) * 86400
+        if self.period == "week":
+            monday = days - (days + 3) % 7
+            return monday * 86400, (monday + 7) * 86400
+        year, month, _ = _civil_from_days(days)
+        if self.period == "year":
+            month, months = 1, 12
+        elif self.period == "quarter":
+            month, months = month - (month - 1) % 3, 3
+        else:
+            months = 1
+        end_year, end_month = year + (month + months - 1) // 12, (month + months - 1) % 12 + 1
+        return _days_from_civil(year, month, 1) * 86400, _days_from_civil(end_year, end_month, 1) * 86400
+
+    def _window(self, wall: int) -> Tuple[int, int, int | None]:
+        # Start and end of the counted window, clamped to the period, and the
+        # period's end.
+        first, last = self._period(wall)
+        if last is None:
+            return self.start, self.end, None
+        end = last if self.end is None else min(first + self.end, last)
+        return min(first + self.start, end), end, last
+
+    def __call__(self, now: datetime | None = None) -> Tuple[int, int]:
+        wall = self._now(now)
+        start, end, _ = self._window(wall)
+        count = -(-(end - start) // self.unit)
+        return count, min(count, max(0, (wall - start) // self.unit))
+
+    def candidates(self, after: datetime):
+        # Every unit boundary inside the window, its end, and the start of the
+        # next period, when the count starts over. Finite for a fixed window.
+        wall = self._now(after)
+        while True:
+            start, end, last = self._window(wall)
+            if wall < start:
+                wall = start
+            elif wall < end:
+                wall = min(start + ((wall - start) // self.unit + 1) * self.unit, end)
+            elif last is not None:
+                wall = last
+            else:
+                return
+            yield self._datetime(wall)
+
+def register_view(name: str, view) -> None:
+    # Adds a mode. `view(now=None)` returns (count, filled); a CompiledView
+    # also tells the daemon when it will next change, while any other
+    # callable is looked at once a minute.
+    name = name.strip().lower()
+    if name in BUILTIN_VIEWS:
+        raise ValueError(f"'{name}' is a built-in mode")
+    VIEW_MAP[name] = view
+
+def compile_view(spec: dict) -> CompiledView:
+    return CompiledView(spec)
+
+def load_views(path: str) -> list[str]:
+    # Registers every view spec in a JSON list and returns their names.
+    with open(os.path.expanduser(path)) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError("the views file must be a JSON list of objects")
+    names = []
+    for n, spec in enumerate(specs, 1):
+        try:
+            view = compile_view(spec)
+            register_view(view.name, view)
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"view {n}: {e}")
+        names.append(view.name)
+    return names
+
+def uses_dob(mode: str) -> bool:
+    return VIEW_MAP.get(mode) in LIFETIME_VIEWS
+
+def evaluate_view(mode: str, config: RenderConfig = DEFAULT_CONFIG, now: datetime | None = None) -> Tuple[int, int]:
+    # Lifetime views also depend on the date of birth and life expectancy.
+    if uses_dob(mode):
+        return VIEW_MAP[mode](now, config.dob, config.life_expectancy)
+    return VIEW_MAP[mode](now)
+
+def render(mode: str, size: Tuple[int, int], config: RenderConfig = DEFAULT_CONFIG,
+           now: datetime | None = None, cancelled=None) -> Image.Image | None:
+    # In-process entry point: draws the view as it stands at `now` and returns
+    # the RGB image without touching the disk (img.tobytes() for raw pixels).
+    # `cancelled()` is polled while drawing; once it is true, None is returned.
+    count, filled = evaluate_view(mode, config, now)
+    return draw_circles_only(count, filled, tuple(size), config, cancelled)
+
+def render_thumbnail(mode: str, size: Tuple[int, int], config: RenderConfig = DEFAULT_CONFIG,
+                     width: int = THUMBNAIL_WIDTH, now: datetime | None = None) -> Image.Image:
+    # Same picture as render() at `width` pixels wide, fast enough to redraw
+    # on every settings change.
+    count, filled = evaluate_view(mode, config, now)
+    return draw_circles_thumbnail(count, filled, tuple(size), config, width)
+
+# Minutes between the instants at which each view can change. Built-in views
+# not listed change at midnight or on calendar dates; registered callables
+# other than compiled specs are looked at every minute.
+VIEW_STEP_MINUTES = {
+    "day": 60,
+    "day-5min": 5,
+    "month-hours": 60,
+}
+
+def _month_start(year: int, month: int) -> datetime:
+    # `month` may run past 12; it carries into the year.
+    return datetime(year + (month - 1) // 12, (month - 1) % 12 + 1, 1)
+
+def _anniversary(year: int, month: int, day: int) -> datetime:
+    # The day the views count a date as reached in that month: the date
+    # itself, or the 1st of the next month when the month is too short.
+    if day <= _days_in_month(year, month):
+        return datetime(year, month, day)
+    return _month_start(year, month + 1)
+
+def _candidate_instants(mode: str, after: datetime, config: RenderConfig = DEFAULT_CONFIG):
+    # Yields, in order, the instants after `after` at which the view may
+    # change. Each is computed directly from the previous one, and every
+    # actual change is among them. Finite for lifetime views, which stop
+    # changing once the life expectancy is reached.
+    view = VIEW_MAP.get(mode)
+    step = VIEW_STEP_MINUTES.get(mode) if mode in BUILTIN_VIEWS else 1
+    if isinstance(view, CompiledView):
+        yield from view.candidates(after)
+    elif view is None:
+        raise ValueError(f"Unknown mode '{mode}'")
+    elif step:
+        moment = after.replace(minute=0, second=0, microsecond=0) + timedelta(minutes=(after.minute // step + 1) * step)
+        while True:
+            yield moment
+            moment += timedelta(minutes=step)
+    elif mode in ("month-day", "year-days"):
+        moment = datetime.combine(after.date() + timedelta(days=1), datetime.min.time())
+        while True:
+            yield moment
+            moment += timedelta(days=1)
+    elif mode == "year-months":
+        month = after.month + 1
+        while True:
+            yield _month_start(after.year, month)
+            month += 1
+    elif mode == "lifetime-years":
+        dob = parse_dob(config.dob)
+        for year in range(max(after.year, dob.year), dob.year + config.life_expectancy + 1):
+            moment = _anniversary(year, dob.month, dob.day)
+            if moment > after:
+                yield moment
+    elif mode == "lifetime-months":
+        dob = parse_dob(config.dob)
+        first = max((after.year, after.month), (dob.year, dob.month))
+        last = dob.year * 12 + dob.month - 1 + config.life_expectancy * 12 + 1
+        for index in range(first[0] * 12 + first[1] - 1, last + 1):
+            year, month = divmod(index, 12)
+            for moment in sorted({_month_start(year, month + 1), _anniversary(year, month + 1, dob.day)}):
+                if moment > after:
+                    yield moment
 
-def set_wallpaper(path: str) -> None:
-    sysname = platform.system()
+def period_boundaries(mode: str, start: datetime, end: datetime,
+                      config: RenderConfig = DEFAULT_CONFIG) -> list[Tuple[datetime, int, int]]:
+    # Every instant in [start, end) at which the view's (count, filled)
+    # changes, with the new value. Only candidate instants are evaluated, so
+    # a year of day-5min costs one view call per 5 minutes, not per minute.
+    just_before = start - timedelta(microseconds=1)
+    previous = evaluate_view(mode, config, just_before)
+    boundaries = []
+    for moment in _candidate_instants(mode, just_before, config):
+        if moment >= end:
+            break
+        value = evaluate_view(mode, config, moment)
+        if value != previous:
+            boundaries.append((moment, *value))
+            previous = value
+    return boundaries
+
+def next_change(mode: str, now: datetime | None = None, config: RenderConfig = DEFAULT_CONFIG) -> datetime:
+    # Usually the first candidate. A view that does not change within a year
+    # (a finished lifetime view, or a spec whose value is constant) is looked
+    # at again after one; a registered callable with no schedule, every minute.
+    now = now or datetime.now()
+    if mode not in BUILTIN_VIEWS and not isinstance(VIEW_MAP.get(mode), CompiledView):
+        return now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    horizon = now + timedelta(days=365)
+    current = evaluate_view(mode, config, now)
+    for moment in _candidate_instants(mode, now, config):
+        if moment > horizon:
+            break
+        if evaluate_view(mode, config, moment) != current:
+            return moment
+    return horizon
+
+def set_wallpaper(path: str) -> bool:
+    # True if the desktop took the picture.
+    sysname = _system()
     if sysname == "Windows":
-        _set_wallpaper_windows(path)
+        return _set_wallpaper_windows(path)
     elif sysname == "Darwin":
-        _set_wallpaper_macos(path)
+        return _set_wallpaper_macos(path)
     elif sysname == "Linux":
         try:
             _set_wallpaper_gnome(path)
+            return True
         except Exception:
             print("Wallpaper set not supported automatically for this Linux DE. Set manually.")
     else:
         print("Unsupported OS for auto-set. Save path:", path)
+    return False
 
-def _set_wallpaper_windows(path: str) -> None:
+def set_wallpaper_outputs(spanned_path: str, paths: list[str], outputs: list[dict]) -> bool:
+    # GNOME takes one picture for the whole virtual screen, so it gets the
+    # composite spanned across monitors; macOS sets each desktop on its own.
+    sysname = _system()
+    if sysname == "Darwin":
+        return _set_wallpaper_macos_desktops(paths)
+    elif sysname == "Linux":
+        try:
+            _set_wallpaper_gnome(spanned_path, options="spanned")
+            return True
+        except Exception:
+            print("Wallpaper set not supported automatically for this Linux DE. Set manually.")
+            return False
+    else:
+        return set_wallpaper(paths[outputs.index(primary_output(outputs))])
+
+def _set_wallpaper_windows(path: str) -> bool:
     import ctypes
     SPI_SETDESKWALLPAPER = 20
     SPIF_UPDATEINIFILE = 0x01
     SPIF_SENDWININICHANGE = 0x02
-    ctypes.windll.user32.SystemParametersInfoW(SPI_SETDESKWALLPAPER, 0, path, SPIF_UPDATEINIFILE | SPIF_SENDWININICHANGE)
+    return bool(ctypes.windll.user32.SystemParametersInfoW(SPI_SETDESKWALLPAPER, 0, path,
+                                                           SPIF_UPDATEINIFILE | SPIF_SENDWININICHANGE))
 
-def _set_wallpaper_macos(path: str) -> None:
+def _set_wallpaper_macos(path: str) -> bool:
+    import subprocess
     script = f'''osascript -e 'tell application "System Events" to tell every desktop to set picture to "{path}"' '''
-    subprocess.call(script, shell=True)
+    return subprocess.call(script, shell=True) == 0
+
+def _set_wallpaper_macos_desktops(paths: list[str]) -> bool:
+    import subprocess
+    return all([subprocess.call(["osascript", "-e", f'tell application "System Events" to set picture of desktop {i} to "{path}"']) == 0
+                for i, path in enumerate(paths, 1)])
 
-def _set_wallpaper_gnome(path: str) -> None:
+def _set_wallpaper_gnome(path: str, options: str | None = None) -> None:
+    import subprocess
     uri = f"file://{path}"
     subprocess.check_call(["gsettings", "set", "org.gnome.desktop.background", "picture-uri", uri])
     try:
         subprocess.check_call(["gsettings", "set", "org.gnome.desktop.background", "picture-uri-dark", uri])
     except Exception:
         pass
+    if options:
+        subprocess.check_call(["gsettings", "set", "org.gnome.desktop.background", "picture-options", options])
 
 def main() -> None:
-    global BACKGROUND, FILLED_COLOR, HOLLOW_COLOR, PERCENTAGE_COLOR, DOB_STR, LIFE_EXPECTANCY_YEARS
+    parse_start = time.perf_counter()
+    import argparse
+    if Image is None:
+        raise SystemExit("This script requires Pillow. Install with: pip install pillow")
     
     parser = argparse.ArgumentParser(
         description="Customizable circles-only time visualizer with percentage display",
@@ -379,18 +1769,28 @@ Mode descriptions:
   - year-days: 1 circle = 1 day this year
   - lifetime-years: 1 circle = 1 year in your expected lifetime
   - lifetime-months: 1 circle = 1 month in your expected lifetime
+  - custom views: 1 circle = the spec's unit (see --views)
 
 Examples:
   python script.py --mode day --show-percentage
   python script.py --mode day-5min --show-percentage
   python script.py --mode month-hours --show-percentage
   python script.py --mode lifetime-years --dob 1990-05-15 --show-percentage --percentage-color yellow
+  python script.py --views views.json --mode workday --show-percentage
   python script.py --bg-color "#1a1a1a" --filled-color "#00ff00" --hollow-color "#ff6600" --show-percentage 
         """)
     
-    parser.add_argument("--mode", type=str, choices=list(VIEW_MAP.keys()), 
-                       default=os.getenv("TIME_VIS_MODE", "day"), 
-                       help="Select the visualization mode")
+    parser.add_argument("--mode", type=str, action="append",
+                       help=f"Select the visualization mode: {', '.join(BUILTIN_VIEWS)} or a view from --views "
+                            "(repeat to render several modes in one run)")
+    parser.add_argument("--views", type=str, default=DEFAULT_VIEWS_PATH,
+                       help="JSON file of custom view specs to register as extra modes")
+    parser.add_argument("--spec", type=str,
+                       help="JSON file listing several images to render in one run")
+    parser.add_argument("--output-dir", type=str,
+                       help="Directory for images rendered with repeated --mode or --spec (default: home directory)")
+    parser.add_argument("--jobs", type=int, default=1,
+                       help="Worker processes for repeated --mode or --spec (0 = one per CPU; default: 1)")
     parser.add_argument("--no-cleanup", action="store_true", 
                        help="Skip cleaning up old wallpapers") 
     
@@ -413,81 +1813,559 @@ Examples:
     
     parser.add_argument("--preview", action="store_true",
                        help="Generate image without setting as wallpaper")
+    parser.add_argument("--size", type=str,
+                       help="Image size as WIDTHxHEIGHT, skipping screen detection")
+
+    parser.add_argument("--format", choices=FORMATS, default="png",
+                       help="Output format: png, webp (lossless), bmp, or svg to emit vector circles without rasterizing (default: png)")
+
+    parser.add_argument("--palette", action="store_true",
+                       help="Store PNG/BMP images with a small fixed palette instead of 24-bit RGB")
+
+    parser.add_argument("--compress-level", type=int, default=DEFAULT_COMPRESS_LEVEL,
+                       help=f"PNG zlib level from 0 (fastest) to 9 (smallest) (default: {DEFAULT_COMPRESS_LEVEL})")
+
+    parser.add_argument("--optimize", action="store_true",
+                       help="Spend extra encode time for the smallest PNG/WebP file")
+
+    parser.add_argument("--font", type=str,
+                       help="TrueType/OpenType font for the percentage text")
+
+    parser.add_argument("--render-memory-mb", type=int,
+                       help=f"Peak memory budget for supersampled rendering in MB (default: {DEFAULT_RENDER_MEMORY_MB})")
+    parser.add_argument("--backend", type=str, choices=BACKENDS, default=DEFAULT_BACKEND,
+                       help="Rendering backend for the circle grid (numpy requires NumPy; default: pillow)")
+    parser.add_argument("--no-incremental", action="store_true",
+                       help="Always redraw every circle instead of patching the previous frame")
+    parser.add_argument("--force", action="store_true",
+                       help="Render and set the wallpaper even if an identical image already exists")
+    parser.add_argument("--prerender", action="store_true",
+                       help="Pre-render every state of the mode into the frame store and exit")
+
+    parser.add_argument("--animate", type=str, metavar="PATH",
+                       help="Export the mode's progress from empty to full as an animation (.gif, .webp, .png/.apng) "
+                            "or, for any other path, as a directory of PNG frames, and exit")
+
+    parser.add_argument("--fps", type=float, default=12,
+                       help="Frames per second for --animate (default: 12)")
+
+    parser.add_argument("--daemon", action="store_true",
+                       help="Keep running and update the wallpaper whenever the selected mode changes")
+    parser.add_argument("--stats-json", type=str,
+                       help="Append per-phase timing and peak memory of each run to this file as one JSON line")
     
     args = parser.parse_args()
-    mode = args.mode.lower()
+    modes = [m.lower() for m in (args.mode or [os.getenv("TIME_VIS_MODE", "day")])]
+    mode = modes[0]
 
-    if mode not in VIEW_MAP:
-        raise SystemExit(f"Unknown mode '{mode}'. Choose one of: {', '.join(VIEW_MAP)}")
+    if args.views:
+        try:
+            load_views(args.views)
+        except (OSError, ValueError) as e:
+            raise SystemExit(f"Invalid views file: {e}")
+
+    for m in modes:
+        if m not in VIEW_MAP:
+            raise SystemExit(f"Unknown mode '{m}'. Choose one of: {', '.join(VIEW_MAP)}")
+
+    config = RenderConfig(show_percentage=args.show_percentage)
 
     if args.bg_color: 
         try:
-            BACKGROUND = parse_color(args.bg_color)
+            config = config._replace(background=parse_color(args.bg_color))
         except ValueError as e:
             raise SystemExit(f"Invalid background color: {e}") 
     
     if args.filled_color:
         try:
-            FILLED_COLOR = parse_color(args.filled_color)
+            config = config._replace(filled_color=parse_color(args.filled_color))
         except ValueError as e:
             raise SystemExit(f"Invalid filled color: {e}")
     
     if args.hollow_color:
         try:
-            HOLLOW_COLOR = parse_color(args.hollow_color)
+            config = config._replace(hollow_color=parse_color(args.hollow_color))
         except ValueError as e:
             raise SystemExit(f"Invalid hollow color: {e}")
     
     if args.percentage_color: 
         try:
-            PERCENTAGE_COLOR = parse_color(args.percentage_color)
+            config = config._replace(percentage_color=parse_color(args.percentage_color))
         except ValueError as e:
             raise SystemExit(f"Invalid percentage color: {e}")
     
     if args.dob:
-        DOB_STR = args.dob
+        config = config._replace(dob=args.dob)
     
     if args.life_expectancy:
-        LIFE_EXPECTANCY_YEARS = args.life_expectancy
+        config = config._replace(life_expectancy=args.life_expectancy)
+
+    canvas_size = None
+    if args.size:
+        try:
+            canvas_size = parse_size(args.size)
+        except ValueError as e:
+            raise SystemExit(str(e))
+
+    if args.font:
+        config = config._replace(font_path=os.path.abspath(os.path.expanduser(args.font)))
+    if config.font_path:
+        try:
+            _load_font(config.font_path, 12)
+        except OSError as e:
+            raise SystemExit(f"Invalid font '{config.font_path}': {e}")
+
+    if args.render_memory_mb is not None:
+        if args.render_memory_mb <= 0:
+            raise SystemExit("Render memory budget must be a positive number of MB")
+        config = config._replace(memory_mb=args.render_memory_mb)
+
+    config = config._replace(backend=args.backend)
+    if config.backend == "numpy" and np is None:
+        print("Warning: NumPy is not installed; falling back to the pillow backend")
+        config = config._replace(backend="pillow")
+
+    if not 0 <= args.compress_level <= 9:
+        raise SystemExit("--compress-level must be between 0 and 9")
+
+    if args.jobs < 0:
+        raise SystemExit("--jobs must be 0 (one per CPU) or a positive number")
+
+    if args.animate:
+        if args.spec or args.daemon or args.prerender or len(modes) > 1:
+            raise SystemExit("--animate exports a single mode; it cannot be combined with --spec, --daemon, --prerender or repeated --mode")
+        if args.fps <= 0:
+            raise SystemExit("--fps must be positive")
+
+    if args.prerender:
+        if args.spec or args.daemon:
+            raise SystemExit("--prerender cannot be combined with --spec or --daemon")
+        if args.format == "svg":
+            raise SystemExit("SVG output is not rasterized and needs no pre-rendering")
+
+    jobs = None
+    if (args.spec or len(modes) > 1) and not args.prerender:
+        if args.daemon:
+            raise SystemExit("--daemon renders a single mode; it cannot be combined with --spec or repeated --mode")
+        if args.spec:
+            try:
+                jobs = load_batch_spec(args.spec, config, args.format)
+            except (OSError, ValueError) as e:
+                raise SystemExit(f"Invalid batch spec: {e}")
+        else:
+            jobs = [_batch_job({"mode": m}, config, args.format) for m in modes]
+        modes = [job["mode"] for job in jobs]
 
-    if mode.startswith("lifetime"):
+    if any(uses_dob(m) for m in modes):
         try:
-            parse_dob(DOB_STR)
+            parse_dob(config.dob)
         except ValueError as e:
             raise SystemExit(f"Invalid date of birth: {e}")
+
+    if args.stats_json:
+        _begin_stats(modes=modes, backend=config.backend)
+        STATS["phases"]["parse"] = {"seconds": round(time.perf_counter() - parse_start, 6), "peak_rss_kb": _peak_rss_kb()}
         
-    if not args.no_cleanup:
-        cleanup_old_wallpapers()
+    with stage("detect_screen_size"):
+        if canvas_size is None:
+            outputs = cached_screen_outputs(refresh=args.force)
+        else:
+            outputs = [_make_output("default", canvas_size)]
+    size = primary_output(outputs)["size"]
+
+    if args.daemon:
+        run_daemon(mode, size, args, config, outputs)
+        return
+    try:
+        if args.animate:
+            path = os.path.abspath(os.path.expanduser(args.animate))
+            with stage("animate"):
+                frames = export_animation(mode, path, size, config, args.fps, encoder_options(args))
+            print(f"Saved: {path} ({frames} frames at {args.fps:g} fps)")
+        elif args.prerender:
+            run_prerender(modes, outputs, args, config)
+        elif jobs is not None:
+            run_batch(jobs, size, args)
+        else:
+            run_once(mode, size, args, config, outputs)
+    finally:
+        if args.stats_json:
+            _write_stats(args.stats_json)
+
+def _record_stats(**fields) -> None:
+    if STATS is not None:
+        STATS.update(fields)
+
+def output_paths(path: str, outputs: list[dict]) -> list[str]:
+    base, ext = os.path.splitext(path)
+    return [f"{base}_{re.sub(r'[^A-Za-z0-9_.-]', '_', o['name'])}{ext}" for o in outputs]
+
+def compose_outputs(outputs: list[dict], images: dict, config: RenderConfig = DEFAULT_CONFIG) -> Image.Image | str:
+    # One canvas covering the whole virtual screen with each output's image
+    # at its position; gaps between differently sized monitors stay background.
+    left = min(o["position"][0] for o in outputs)
+    top = min(o["position"][1] for o in outputs)
+    right = max(o["position"][0] + o["size"][0] for o in outputs)
+    bottom = max(o["position"][1] + o["size"][1] for o in outputs)
+    if isinstance(images[outputs[0]["size"]], str):
+        # SVG documents nest as positioned <svg> elements.
+        nested = [images[o["size"]].replace("<svg ", f'<svg x="{o["position"][0] - left}" y="{o["position"][1] - top}" ', 1)
+                  for o in outputs]
+        return draw_circles_svg(0, 0, (right - left, bottom - top), config).replace("</svg>", "".join(nested) + "</svg>")
+    canvas = Image.new("RGB", (right - left, bottom - top), config.background)
+    for o in outputs:
+        canvas.paste(images[o["size"]], (o["position"][0] - left, o["position"][1] - top))
+    return canvas
 
-    if CANVAS_SIZE is None:
-        size = detect_screen_size()
+def _draw(mode: str, count: int, filled: int, size: Tuple[int, int], config: RenderConfig,
+          fmt: str, incremental: bool = True) -> Image.Image | str:
+    if fmt == "svg":
+        return draw_circles_svg(count, filled, size, config)
+    if not incremental:
+        return draw_circles_only(count, filled, size, config)
+    return render_incremental(mode, count, filled, size, config)
+
+@lru_cache(maxsize=8)
+def _fixed_palette(background: Tuple[int, int, int], filled: Tuple[int, int, int], hollow: Tuple[int, int, int],
+                   percentage: Tuple[int, int, int]) -> Image.Image:
+    # Every pixel is a blend of two scene colors (a circle edge over the
+    # background, the badge over the background or over a circle it crosses,
+    # text over the badge), so evenly spaced ramps between those pairs cover
+    # the whole image.
+    badge = tuple(int(c * 0.8) if c > 128 else int(c + 50) for c in background)
+    pairs = list(dict.fromkeys(pair for pair in ((background, filled), (background, hollow),
+                                                   (background, badge), (badge, filled), (badge, hollow),
+                                                   (badge, percentage)) if pair[0] != pair[1]))
+    colors = [background]
+    steps = 256 // max(1, len(pairs))
+    for a, b in pairs:
+        for k in range(1, steps):
+            colors.append(tuple(round(a[i] + (b[i] - a[i]) * k / (steps - 1)) for i in range(3)))
+    colors = list(dict.fromkeys(colors))[:256]
+    palette = Image.new("P", (1, 1))
+    palette.putpalette([v for c in colors for v in c])
+    return palette
+
+def encoder_options(args: argparse.Namespace) -> dict:
+    return {"palette": args.palette, "compress_level": args.compress_level, "optimize": args.optimize}
+
+def encode_image(img: Image.Image, fp, fmt: str = "png", encoder: dict | None = None,
+                 config: RenderConfig = DEFAULT_CONFIG) -> None:
+    encoder = encoder or {}
+    if encoder.get("palette") and fmt in ("png", "bmp"):
+        # Nearest-color mapping onto the fixed palette; much cheaper than an
+        # adaptive quantizer and shrinks the data zlib has to chew through.
+        palette = _fixed_palette(config.background, config.filled_color, config.hollow_color, config.percentage_color)
+        img = img.quantize(palette=palette, dither=Image.Dither.NONE)
+    if fmt == "png":
+        img.save(fp, format="PNG", compress_level=encoder.get("compress_level", DEFAULT_COMPRESS_LEVEL),
+                 optimize=encoder.get("optimize", False))
+    elif fmt == "webp":
+        img.save(fp, format="WEBP", lossless=True, method=6 if encoder.get("optimize") else 0)
     else:
-        size = CANVAS_SIZE 
+        img.save(fp, format=fmt.upper())
+
+def save_output(img: Image.Image | str, path: str, fmt: str = "png", encoder: dict | None = None,
+                config: RenderConfig = DEFAULT_CONFIG) -> None:
+    # Written to a temporary file and renamed into place, so the desktop or a
+    # concurrent run never sees a half-written image.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        if fmt == "svg":
+            with open(tmp_path, "w") as f:
+                f.write(img)
+        else:
+            encode_image(img, tmp_path, fmt, encoder, config)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _apply_wallpaper(path: str, paths: list[str], outputs: list[dict] | None) -> bool:
+    if outputs:
+        return set_wallpaper_outputs(path, paths, outputs)
+    return set_wallpaper(path)
+
+def run_once(mode: str, size: Tuple[int, int], args: argparse.Namespace, config: RenderConfig = DEFAULT_CONFIG,
+             outputs: list[dict] | None = None) -> None:
+    # With several monitors every output gets its own image, and the slot
+    # file holds the composite of the whole virtual screen.
+    outputs = outputs if outputs and len(outputs) > 1 else None
+    with stage("view"):
+        count, filled = evaluate_view(mode, config)
+    _record_stats(size=list(size), count=count, filled=filled)
+    if outputs:
+        _record_stats(outputs=[o["name"] for o in outputs])
+    key = output_key(mode, count, filled, size, config, outputs, args.format, encoder_options(args))
+    cached = None if args.force else lookup_output(key)
+    # Only an image that is on screen right now may skip the wallpaper update.
+    if cached and (args.preview or current_output() == key):
+        _record_stats(result="unchanged")
+        print(f"Unchanged: {cached['path']} ({count} circles; {filled} filled)")
+        return
+    if cached:
+        _record_stats(result="reused")
+        print(f"Reusing: {cached['path']} ({count} circles; {filled} filled)")
+        # Make the reused slot the newer one, so the next render overwrites
+        # the other slot instead of the wallpaper on screen.
+        for path in _entry_paths(cached):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        try:
+            with stage("set_wallpaper"):
+                applied = _apply_wallpaper(cached["path"], _entry_paths(cached), outputs)
+            record_output(key, cached["path"], applied, _entry_paths(cached))
+            print("Wallpaper set." if applied else "You can set it manually using the saved image.")
+        except Exception as e:
+            print("Could not set wallpaper automatically:", e)
+        return
 
-    count, filled = VIEW_MAP[mode]()
-    img = draw_circles_only(count, filled, size, show_percentage=args.show_percentage)
+    _record_stats(result="rendered")
+    out_path = next_output_path(args.format)
+    if not args.no_cleanup:
+        with stage("cleanup"):
+            cleanup_old_wallpapers(args.format, outputs)
+
+    # Frames from --prerender are used as they are: no drawing or encoding.
+    frames = {}
+    if args.format != "svg" and not args.force:
+        for frame_size in [o["size"] for o in outputs] if outputs else [size]:
+            frames[frame_size] = frame_path(mode, count, filled, frame_size, config, args.format,
+                                            encoder_options(args))
+    if any(frames.values()):
+        _record_stats(result="prerendered")
 
-    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
-    img.save(OUTPUT_PATH, format="PNG")
-    print(f"Saved: {OUTPUT_PATH} ({count} circles; {filled} filled)")
-    print(f"Colors: Background={BACKGROUND}, Filled={FILLED_COLOR}, Hollow={HOLLOW_COLOR}")
+    with stage("draw"):
+        if outputs:
+            # Layout and rasterization are shared between outputs of one size.
+            images = {}
+            for o in outputs:
+                if o["size"] not in images:
+                    images[o["size"]] = (Image.open(frames[o["size"]]) if frames.get(o["size"]) else
+                                         _draw(mode, count, filled, o["size"], config,
+                                               args.format, not args.no_incremental))
+            img = compose_outputs(outputs, images, config)
+        elif not frames.get(size):
+            img = _draw(mode, count, filled, size, config, args.format, not args.no_incremental)
+
+    paths = [out_path]
+    with stage("save"):
+        if not outputs and frames.get(size):
+            copy_output(frames[size], out_path)
+        else:
+            save_output(img, out_path, args.format, encoder_options(args), config)
+        if outputs:
+            paths = output_paths(out_path, outputs)
+            for o, path in zip(outputs, paths):
+                if frames.get(o["size"]):
+                    copy_output(frames[o["size"]], path)
+                else:
+                    save_output(images[o["size"]], path, args.format, encoder_options(args), config)
+    print(f"Saved: {out_path} ({count} circles; {filled} filled)")
+    if outputs:
+        for o, path in zip(outputs, paths):
+            print(f"  {o['name']} {o['size'][0]}x{o['size'][1]}+{o['position'][0]}+{o['position'][1]}: {path}")
+    print(f"Colors: Background={config.background}, Filled={config.filled_color}, Hollow={config.hollow_color}")
     
-    if args.show_percentage:
+    if config.show_percentage:
         percentage = (filled / count) * 100 if count > 0 else 0
-        print(f"Percentage displayed: {percentage:.1f}% (Color: {PERCENTAGE_COLOR})")
+        print(f"Percentage displayed: {percentage:.1f}% (Color: {config.percentage_color})")
     
-    if mode.startswith("lifetime"):
-        print(f"Date of birth: {DOB_STR}, Life expectancy: {LIFE_EXPECTANCY_YEARS} years")
+    if uses_dob(mode):
+        print(f"Date of birth: {config.dob}, Life expectancy: {config.life_expectancy} years")
 
     if not args.preview:
         try:
-            set_wallpaper(OUTPUT_PATH)
-            print("Wallpaper set.")
+            with stage("set_wallpaper"):
+                applied = _apply_wallpaper(out_path, paths, outputs)
+            record_output(key, out_path, applied, paths)
+            print("Wallpaper set." if applied else "You can set it manually using the saved image.")
         except Exception as e:
+            record_output(key, out_path, False, paths)
             print("Could not set wallpaper automatically:", e)
             print("You can set it manually using the saved image.")
     else:
+        record_output(key, out_path, False, paths)
         print("Preview mode: wallpaper not set automatically.") 
 
+def run_prerender(modes: list[str], outputs: list[dict], args: argparse.Namespace,
+                  config: RenderConfig = DEFAULT_CONFIG) -> None:
+    sizes = list(dict.fromkeys(o["size"] for o in outputs))
+    for mode in modes:
+        with stage("view"):
+            count, _ = evaluate_view(mode, config)
+        for size in sizes:
+            with stage("prerender"):
+                frame_dir = prerender_frames(mode, count, size, config, args.format, encoder_options(args))
+            print(f"Stored {count + 1} frames for {mode} at {size[0]}x{size[1]} in {frame_dir}")
+
+def parse_size(size_str: str) -> Tuple[int, int]:
+    try:
+        w, h = map(int, size_str.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid size '{size_str}'. Use WIDTHxHEIGHT, e.g. 1920x1080.")
+    if w <= 0 or h <= 0:
+        raise ValueError(f"Invalid size '{size_str}'. Width and height must be positive.")
+    return w, h
+
+def _batch_job(entry: dict, config: RenderConfig = DEFAULT_CONFIG, fmt: str = "png") -> dict:
+    # Normalizes one spec entry into a picklable job; anything not given in
+    # the entry falls back to the command-line options.
+    mode = str(entry.get("mode", "")).lower()
+    if mode not in VIEW_MAP:
+        raise ValueError(f"unknown mode '{mode}'. Choose one of: {', '.join(VIEW_MAP)}")
+    job = {
+        "mode": mode,
+        "size": parse_size(entry["size"]) if entry.get("size") else None,
+        "config": config._replace(show_percentage=bool(entry.get("show_percentage", config.show_percentage))),
+        "output": os.path.expanduser(entry["output"]) if entry.get("output") else None,
+        "wallpaper": bool(entry.get("wallpaper", False)),
+        "format": str(entry.get("format", fmt)).lower(),
+    }
+    if job["format"] not in FORMATS:
+        raise ValueError(f"unknown format '{job['format']}'. Choose one of: {', '.join(FORMATS)}")
+    for field, attr in (("bg_color", "background"), ("filled_color", "filled_color"),
+                        ("hollow_color", "hollow_color"), ("percentage_color", "percentage_color")):
+        if entry.get(field):
+            job["config"] = job["config"]._replace(**{attr: parse_color(entry[field])})
+    return job
+
+def load_batch_spec(path: str, config: RenderConfig = DEFAULT_CONFIG, fmt: str = "png") -> list[dict]:
+    with open(path) as f:
+        entries = json.load(f)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("the spec must be a non-empty JSON list of objects")
+    jobs = []
+    for n, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            raise ValueError(f"entry {n} is not an object")
+        try:
+            jobs.append(_batch_job(entry, config, fmt))
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"entry {n}: {e}")
+    return jobs
+
+def render_job(job: dict, count: int, filled: int, args: argparse.Namespace) -> Tuple[str, str | None]:
+    # Returns the status line and, if an image was written, its output key.
+    # Recording the key is left to the caller so parallel workers never race
+    # on the output index. Each job carries its whole render config, so pool
+    # workers need no state from the parent process.
+    mode, size, path, config = job["mode"], job["size"], job["output"], job["config"]
+    key = output_key(mode, count, filled, size, config, fmt=job["format"], encoder=encoder_options(args))
+    cached = None if args.force else lookup_output(key)
+    if cached and cached["path"] == path:
+        return f"Unchanged: {path} ({mode}; {count} circles; {filled} filled)", None
+
+    with stage("draw"):
+        img = _draw(mode, count, filled, size, config, job["format"], not args.no_incremental)
+    with stage("save"):
+        save_output(img, path, job["format"], encoder_options(args), config)
+    return f"Saved: {path} ({mode}; {count} circles; {filled} filled)", key
+
+def run_batch(jobs: list[dict], size: Tuple[int, int], args: argparse.Namespace) -> None:
+    output_dir = os.path.expanduser(args.output_dir) if args.output_dir else os.path.dirname(next_output_path())
+    used = set()
+    for job in jobs:
+        job["size"] = job["size"] or size
+        if job["output"] is None:
+            w, h = job["size"]
+            base = os.path.join(output_dir, f"count_{job['mode']}_{w}x{h}")
+            ext = job["format"]
+            path, n = f"{base}.{ext}", 2
+            while path in used:
+                path, n = f"{base}_{n}.{ext}", n + 1
+            job["output"] = path
+        used.add(job["output"])
+
+    # Every mode is evaluated once up front, so all images in the batch agree
+    # on the same moment even if rendering crosses a boundary.
+    now = datetime.now()
+    views = {}
+    with stage("view"):
+        for job in jobs:
+            if job["mode"] not in views:
+                views[job["mode"]] = evaluate_view(job["mode"], job["config"], now)
+
+    workers = args.jobs or os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    results = {}
+    if workers <= 1:
+        for n, job in enumerate(jobs):
+            try:
+                results[n] = render_job(job, *views[job["mode"]], args)
+            except Exception as e:
+                results[n] = (f"Failed: {job['output']} ({job['mode']}): {e}", None)
+            print(results[n][0])
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        print(f"Rendering {len(jobs)} images with {workers} worker processes")
+        with stage("pool"), ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render_job, job, *views[job["mode"]], args): n
+                       for n, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                n = futures[future]
+                try:
+                    results[n] = future.result()
+                except Exception as e:
+                    results[n] = (f"Failed: {jobs[n]['output']} ({jobs[n]['mode']}): {e}", None)
+                print(results[n][0], flush=True)
+
+    for n, job in enumerate(jobs):
+        message, key = results[n]
+        if key:
+            record_output(key, job["output"], False)
+        if job["wallpaper"] and not args.preview and not message.startswith("Failed"):
+            try:
+                with stage("set_wallpaper"):
+                    applied = set_wallpaper(job["output"])
+                if applied:
+                    set_current_output(output_key(job["mode"], *views[job["mode"]], job["size"], job["config"],
+                                                  fmt=job["format"], encoder=encoder_options(args)))
+                    print("Wallpaper set.")
+            except Exception as e:
+                print("Could not set wallpaper automatically:", e)
+
+def run_daemon(mode: str, size: Tuple[int, int], args: argparse.Namespace, config: RenderConfig = DEFAULT_CONFIG,
+               outputs: list[dict] | None = None) -> None:
+    if outputs and len(outputs) > 1:
+        print(f"Daemon started for mode '{mode}' on {', '.join(o['name'] for o in outputs)}")
+    else:
+        print(f"Daemon started for mode '{mode}' at {size[0]}x{size[1]}")
+    try:
+        _daemon_loop(mode, size, args, config, outputs)
+    except KeyboardInterrupt:
+        print("Daemon stopped.")
+
+def _daemon_loop(mode: str, size: Tuple[int, int], args: argparse.Namespace, config: RenderConfig = DEFAULT_CONFIG,
+                 outputs: list[dict] | None = None) -> None:
+    while True:
+        try:
+            if args.stats_json:
+                _begin_stats(modes=[mode], backend=config.backend)
+            try:
+                run_once(mode, size, args, config, outputs)
+            finally:
+                if args.stats_json:
+                    _write_stats(args.stats_json)
+            wake_at = next_change(mode, config=config)
+        except Exception as e:
+            print(f"Warning: Update failed: {e}")
+            wake_at = datetime.now() + timedelta(minutes=1)
+        print(f"Next update at {wake_at:%Y-%m-%d %H:%M:%S}", flush=True)
+
+        # Sleep in bounded chunks so suspend/resume or a clock change cannot
+        # push the update far past its boundary.
+        while True:
+            remaining = (wake_at - datetime.now()).total_seconds()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 3600))
+
 if __name__ == "__main__":
     main()
\ No newline at end of file